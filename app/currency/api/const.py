@@ -1,2 +1,10 @@
-cache_timeout = 3600
-rates_cache_key = 'rates'
\ No newline at end of file
+# кеши api сбрасываются при изменении данных (поколение кеша api и сигналы),
+# поэтому таймауты только ограничивают память под неиспользуемые записи
+rates_cache_timeout = 60 * 60 * 24
+user_currencies_cache_timeout = 60 * 60 * 24 * 7
+rates_cache_key = 'rates'
+api_cache_generation_key = 'api_cache_generation'
+user_currencies_cache_key = 'user_currencies'
+rate_table_cache_key = 'rate_table'
+# максимальное количество валют в одном запросе аналитики нескольких валют
+batch_analytics_max_ids = 100
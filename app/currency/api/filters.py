@@ -1,5 +1,13 @@
+import typing as t
+
+from django import forms
+from django.db.models import QuerySet
 from django_filters import rest_framework
 
+from app.currency.api import const
+from app.currency.models import CurrencyPriceRollup
+from app.currency.rollups import period_start
+
 
 class DateRangeFilter(rest_framework.FilterSet):
     """Фильтр по интервалу дат"""
@@ -14,3 +22,56 @@ class DateRangeFilter(rest_framework.FilterSet):
 
     class Meta:
         fields = ['date_from', 'date_to']
+
+
+class AnalyticsFilter(DateRangeFilter):
+    """
+    Фильтр аналитики по интервалу дат с шагом выборки: по дням
+    или свертками за неделю или месяц. Для сверток в выборку попадают
+    периоды, пересекающиеся с интервалом дат.
+    """
+    interval = rest_framework.ChoiceFilter(
+        choices=[('day', 'День'), *CurrencyPriceRollup.Interval.choices],
+        method='filter_interval',
+    )
+
+    class Meta:
+        fields = ['date_from', 'date_to', 'interval']
+
+    def filter_interval(self, queryset: QuerySet, *args) -> QuerySet:
+        # шаг выборки определяет модель qs, ее выбирает представление
+        return queryset
+
+    def filter_queryset(self, queryset: QuerySet) -> QuerySet:
+        data = self.form.cleaned_data
+        if data.get('date_from') and queryset.model is CurrencyPriceRollup:
+            data['date_from'] = period_start(
+                data['date_from'], data['interval']
+            )
+        return super().filter_queryset(queryset)
+
+
+class NumberInFilter(rest_framework.BaseInFilter, rest_framework.NumberFilter):
+    """Фильтр по списку чисел через запятую."""
+
+
+class BatchAnalyticsForm(forms.Form):
+    """Форма фильтра аналитики нескольких валют."""
+
+    def clean_ids(self) -> t.Optional[t.List[int]]:
+        """Ограничивает количество валют в одном запросе."""
+        ids = self.cleaned_data.get('ids')
+        if ids and len(ids) > const.batch_analytics_max_ids:
+            raise forms.ValidationError(
+                f'Не больше {const.batch_analytics_max_ids} валют за запрос.'
+            )
+        return ids
+
+
+class BatchAnalyticsFilter(DateRangeFilter):
+    """Фильтр аналитики нескольких валют: список id валют и интервал дат."""
+    ids = NumberInFilter(field_name='currency_id', lookup_expr='in')
+
+    class Meta:
+        fields = ['ids', 'date_from', 'date_to']
+        form = BatchAnalyticsForm
@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class AnalyticsCursorPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация истории цен: страница выбирается
+    условием по дате, а не смещением, поэтому время ответа
+    не зависит от глубины страницы.
+    Пагинация включается, только если передан размер страницы.
+    """
+    ordering = ('-date', '-id')
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
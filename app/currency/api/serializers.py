@@ -1,6 +1,8 @@
+import typing as t
+
 from rest_framework import serializers
 
-from app.currency.models import Currency, UserCurrency
+from app.currency.models import Currency, CurrencyPriceRollup, UserCurrency
 
 
 class UserCurrencySerializer(serializers.ModelSerializer):
@@ -48,3 +50,58 @@ class AnalyticsSerializer(serializers.ModelSerializer):
             'id', 'date', 'charcode', 'value', 'is_max_value',
             'is_min_value', 'threshold_match_type', 'percentage_ratio',
         )
+
+
+class AnalyticsRollupSerializer(serializers.ModelSerializer):
+    """Сериалайзер для отображения сверток истории цен за период."""
+    id = serializers.IntegerField(source='currency_id')
+    date = serializers.DateField()
+    charcode = serializers.CharField(source='currency.char_code')
+    open = serializers.FloatField()
+    high = serializers.FloatField()
+    low = serializers.FloatField()
+    close = serializers.FloatField()
+    average = serializers.FloatField()
+
+    class Meta:
+        model = CurrencyPriceRollup
+        fields = (
+            'id', 'date', 'charcode', 'open', 'high', 'low', 'close',
+            'average', 'count',
+        )
+
+
+class AnalyticsSummarySerializer(serializers.Serializer):
+    """Сериалайзер для отображения сводки по истории цен валюты."""
+    count = serializers.IntegerField()
+    first_date = serializers.DateField()
+    last_date = serializers.DateField()
+    min = serializers.FloatField()
+    max = serializers.FloatField()
+    average = serializers.FloatField()
+    stddev = serializers.FloatField()
+    first = serializers.FloatField()
+    last = serializers.FloatField()
+    change_percent = serializers.FloatField()
+
+
+class ConvertSerializer(serializers.Serializer):
+    """Сериалайзер параметров конвертации суммы между валютами."""
+    to = serializers.CharField()
+    amount = serializers.FloatField(default=1)
+    date = serializers.DateField(required=False)
+
+    def get_fields(self) -> t.Dict[str, serializers.Field]:
+        # from - ключевое слово python, поэтому поле добавляется здесь
+        fields = super().get_fields()
+        fields['from'] = serializers.CharField()
+        return fields
+
+
+class CrossRatesSerializer(serializers.Serializer):
+    """Сериалайзер параметров матрицы кросс-курсов."""
+    codes = serializers.CharField(required=False)
+    date = serializers.DateField(required=False)
+
+    def validate_codes(self, value: str) -> t.List[str]:
+        return [x.strip() for x in value.split(',') if x.strip()]
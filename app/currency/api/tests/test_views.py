@@ -1,22 +1,32 @@
 import datetime
+import statistics
 import typing as t
 from decimal import Decimal
 
 from django.core.cache import cache
+from django.db import connection
 from django.db.models import Max, Min
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from app.currency.models import Currency, CurrencyPrice, UserCurrency
-from app.currency.tests.factories import UserCurrencyFactory
+from app.currency.api import const
+from app.currency.helpers import clear_api_cache
+from app.currency.models import (Currency, CurrencyPrice, CurrencyPriceRollup,
+                                 LatestCurrencyPrice, UserCurrency)
+from app.currency.rollups import period_start
+from app.currency.tests.factories import (CurrencyPriceFactory,
+                                          UserCurrencyFactory)
 from app.currency.tests.mixins import (CurrenciesSetupMixin,
                                        CurrencyPricesSetupMixin)
 from app.users.models import User
+from app.tools.tests.mixins import QueryCountMixin
 from app.users.tests.mixins import UsersSetupMixin
 
 
-class UserCurrencyCreateViewTestCase(UsersSetupMixin,
+class UserCurrencyCreateViewTestCase(QueryCountMixin,
+                                     UsersSetupMixin,
                                      CurrenciesSetupMixin,
                                      APITestCase):
     """Кейс для api добавления валюты в список отслеживаемых."""
@@ -67,8 +77,30 @@ class UserCurrencyCreateViewTestCase(UsersSetupMixin,
         response = self.client.post(self.url, data=data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_constant_queries(self) -> None:
+        """
+        Проверяет, что количество запросов не зависит от количества
+        отслеживаемых пользователем валют.
+        """
+        currencies = iter(self.currencies)
+
+        def request() -> None:
+            response = self.client.post(self.url, data={
+                'currency': next(currencies).id,
+                'threshold': 100,
+            })
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertConstantQueries(
+            request=request,
+            grow=lambda: UserCurrencyFactory(
+                user=self.user, currency=next(currencies)
+            ),
+        )
+
 
-class RatesViewTestCase(UsersSetupMixin,
+class RatesViewTestCase(QueryCountMixin,
+                        UsersSetupMixin,
                         CurrencyPricesSetupMixin,
                         APITestCase):
     """Кейс для api получения дневных котировок."""
@@ -185,6 +217,121 @@ class RatesViewTestCase(UsersSetupMixin,
 
                 self.assert_prices_response(data, expected_prices)
 
+    def test_clear_api_cache(self) -> None:
+        """
+        Проверяет, что ответ api берется из кеша до его сброса,
+        а после сброса отражает новые котировки.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        LatestCurrencyPrice.objects.update(value=Decimal('1.2345'))
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.json(), response.json())
+
+        clear_api_cache()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json())
+        for item in response.json():
+            self.assertEqual(Decimal(str(item['value'])), Decimal('1.2345'))
+
+    def test_user_currencies_cached(self) -> None:
+        """
+        Проверяет, что валюты пользователя не запрашиваются из БД
+        при каждом запросе.
+        """
+        response = self.client.get(self.url, {'order_by': 'value'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # запрашивается только общий список котировок для другой сортировки
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.json()), len(self.user_currencies))
+
+    def test_constant_queries(self) -> None:
+        """
+        Проверяет, что количество запросов не зависит от количества
+        валют в ответе.
+        """
+        def request() -> None:
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        for user in (None, self.user):
+            with self.subTest(user=user):
+                self.client.force_authenticate(user)
+                self.assertConstantQueries(
+                    request=request,
+                    grow=lambda: self.create_price_history(
+                        self.create_currencies(n=2), days=1
+                    ),
+                )
+
+    def test_add_currency_then_get_rates(self) -> None:
+        """
+        Проверяет, что добавленная через api валюта сразу появляется
+        в ответе api котировок, без сброса кешей api.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.json()), len(self.user_currencies))
+
+        currency = self.currencies[-1]
+        response = self.client.post(
+            reverse('currency:user-currency'),
+            data={'currency': currency.id, 'threshold': 100},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(self.url)
+        ids = [x['id'] for x in response.json()]
+        self.assertEqual(len(ids), len(self.user_currencies) + 1)
+        self.assertIn(currency.id, ids)
+
+    def test_save_price_then_get_rates(self) -> None:
+        """
+        Проверяет, что сохраненная отдельно котировка (например, в админке)
+        сразу появляется в ответе api котировок.
+        """
+        self.client.get(self.url)
+
+        currency = self.user_currencies[0]
+        price = CurrencyPrice.objects.get(
+            currency=currency, date=datetime.date.today()
+        )
+        price.value = Decimal('9.8765')
+        price.save()
+
+        response = self.client.get(self.url)
+        item = next(x for x in response.json() if x['id'] == currency.id)
+        self.assertEqual(Decimal(str(item['value'])), price.value)
+
+    def test_user_currencies_cache_invalidated(self) -> None:
+        """
+        Проверяет, что ответ api учитывает изменение списка
+        отслеживаемых валют пользователя.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.json()), len(self.user_currencies))
+
+        currency = self.currencies[-1]
+        user_currency = UserCurrencyFactory(user=self.user, currency=currency)
+
+        response = self.client.get(self.url)
+        ids = [x['id'] for x in response.json()]
+        self.assertEqual(len(ids), len(self.user_currencies) + 1)
+        self.assertIn(currency.id, ids)
+
+        # удаление через queryset тоже отправляет сигналы
+        UserCurrency.objects.filter(pk=user_currency.pk).delete()
+
+        response = self.client.get(self.url)
+        ids = [x['id'] for x in response.json()]
+        self.assertNotIn(currency.id, ids)
+
     def assert_prices_response(
             self,
             response_data: t.List[t.Dict],
@@ -202,7 +349,8 @@ class RatesViewTestCase(UsersSetupMixin,
             self.assertEqual(Decimal(str(item['value'])), expected.value)
 
 
-class AnalyticsViewTestCase(UsersSetupMixin,
+class AnalyticsViewTestCase(QueryCountMixin,
+                            UsersSetupMixin,
                             CurrencyPricesSetupMixin,
                             APITestCase):
     """Кейс для api получения аналитики по валюте."""
@@ -295,6 +443,257 @@ class AnalyticsViewTestCase(UsersSetupMixin,
         self.assertEqual(min_date, params['date_from'])
         self.assertEqual(max_date, params['date_to'])
 
+    def test_cursor_pagination(self) -> None:
+        """
+        Проверяет постраничную выдачу аналитики с фильтром по датам:
+        страницы покрывают всю выборку, а признаки максимума и минимума
+        считаются по всей выборке, а не по странице.
+        """
+        today = datetime.date.today()
+        params = {
+            'date_from': (today - datetime.timedelta(days=8)).isoformat(),
+            'date_to': (today - datetime.timedelta(days=1)).isoformat(),
+        }
+        expected = self.client.get(self.url, params).json()
+        self.assertEqual(len(expected), 8)
+
+        items = []
+        url, page_params = self.url, {**params, 'page_size': 3}
+        while url:
+            response = self.client.get(url, page_params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            data = response.json()
+            self.assertLessEqual(len(data['results']), 3)
+            items += data['results']
+            # ссылка на следующую страницу содержит все параметры
+            url, page_params = data['next'], None
+
+        self.assertEqual(items, expected)
+        self.assertEqual(sum(x['is_max_value'] for x in items), 1)
+        self.assertEqual(sum(x['is_min_value'] for x in items), 1)
+
+    def test_cursor_pagination_keyset(self) -> None:
+        """
+        Проверяет, что следующая страница выбирается условием по дате,
+        а не смещением.
+        """
+        response = self.client.get(self.url, {'page_size': 3})
+        next_url = response.json()['next']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(next_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        sql = queries.captured_queries[-1]['sql']
+        self.assertIn('"date" <', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_max_points(self) -> None:
+        """
+        Проверяет прореживание выборки: в ответе не больше max_points
+        котировок, среди них первая, последняя, максимальная и минимальная.
+        """
+        expected = self.client.get(self.url).json()
+
+        response = self.client.get(self.url, {'max_points': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        data = response.json()
+        self.assertLessEqual(len(data), 5)
+        self.assertEqual(data[0], expected[0])
+        self.assertEqual(data[-1], expected[-1])
+        for item in data:
+            self.assertIn(item, expected)
+        self.assertTrue(any(x['is_max_value'] for x in data))
+        self.assertTrue(any(x['is_min_value'] for x in data))
+
+        response = self.client.get(self.url, {'max_points': 3})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('max_points', response.json())
+
+    def test_interval(self) -> None:
+        """
+        Проверяет выборку сверток за неделю и месяц вместо дневных цен:
+        в выборку попадают периоды, пересекающиеся с интервалом дат.
+        """
+        today = datetime.date.today()
+        prices = list(CurrencyPrice.objects.filter(currency=self.currency))
+
+        for interval in CurrencyPriceRollup.Interval.values:
+            with self.subTest(interval=interval):
+                response = self.client.get(self.url, {'interval': interval})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+                data = response.json()
+                periods = sorted(
+                    {period_start(x.date, interval) for x in prices},
+                    reverse=True,
+                )
+                self.assertEqual(
+                    [x['date'] for x in data],
+                    [x.isoformat() for x in periods],
+                )
+                for item in data:
+                    values = [
+                        float(x.value) for x in prices
+                        if period_start(x.date, interval).isoformat()
+                        == item['date']
+                    ]
+                    self.assertEqual(item['count'], len(values))
+                    self.assertEqual(item['high'], max(values))
+                    self.assertEqual(item['low'], min(values))
+
+                params = {
+                    'interval': interval,
+                    'date_from': today.isoformat(),
+                    'page_size': 1,
+                }
+                data = self.client.get(self.url, params).json()
+                self.assertEqual(
+                    [x['date'] for x in data['results']],
+                    [period_start(today, interval).isoformat()],
+                )
+                # сводка считается по дневным ценам интервала дат
+                self.assertEqual(data['summary']['count'], 1)
+
+        response = self.client.get(self.url, {'interval': 'year'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_summary(self) -> None:
+        """
+        Проверяет сводку по выборке с фильтром по датам: она считается
+        одним запросом без оконных функций и совпадает со сводкой
+        в ответе со страницей выборки.
+        """
+        today = datetime.date.today()
+        params = {
+            'date_from': (today - datetime.timedelta(days=8)).isoformat(),
+            'date_to': (today - datetime.timedelta(days=1)).isoformat(),
+        }
+        prices = list(
+            CurrencyPrice.objects.filter(
+                currency=self.currency,
+                date__range=(params['date_from'], params['date_to']),
+            ).order_by('date').values_list('value', flat=True)
+        )
+        url = reverse(
+            'currency:analytics-summary',
+            kwargs={'id': self.currency.id}
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn(' OVER ', queries[0]['sql'])
+
+        summary = response.json()
+        self.assertEqual(summary['count'], len(prices))
+        self.assertEqual(summary['first_date'], params['date_from'])
+        self.assertEqual(summary['last_date'], params['date_to'])
+        self.assertEqual(summary['min'], float(min(prices)))
+        self.assertEqual(summary['max'], float(max(prices)))
+        self.assertEqual(summary['first'], float(prices[0]))
+        self.assertEqual(summary['last'], float(prices[-1]))
+        self.assertAlmostEqual(
+            summary['average'], float(sum(prices) / len(prices))
+        )
+        self.assertAlmostEqual(
+            summary['stddev'], statistics.pstdev(float(x) for x in prices)
+        )
+        self.assertEqual(
+            summary['change_percent'],
+            float(round((prices[-1] - prices[0]) / prices[0] * 100, 2)),
+        )
+
+        response = self.client.get(self.url, {**params, 'page_size': 3})
+        self.assertEqual(response.json()['summary'], summary)
+
+    def test_summary_empty_range(self) -> None:
+        """Проверяет сводку по пустой выборке."""
+        url = reverse(
+            'currency:analytics-summary',
+            kwargs={'id': self.currency.id}
+        )
+        params = {'date_from': '2000-01-01', 'date_to': '2000-01-02'}
+
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        summary = response.json()
+        self.assertEqual(summary['count'], 0)
+        self.assertIsNone(summary['average'])
+        self.assertIsNone(summary['change_percent'])
+
+    def test_summary_only_paginated(self) -> None:
+        """
+        Проверяет, что полная сводка по выборке считается только
+        для ответа со страницей, в который она попадает.
+        """
+        cases = (
+            ({}, False),
+            ({'interval': 'week'}, False),
+            ({'page_size': 3}, True),
+            ({'interval': 'week', 'page_size': 3}, True),
+        )
+        for params, expected in cases:
+            with self.subTest(params=params):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+                summary_queries = [
+                    x for x in queries if 'STDDEV' in x['sql'].upper()
+                ]
+                self.assertEqual(bool(summary_queries), expected)
+
+    def test_constant_queries(self) -> None:
+        """
+        Проверяет, что количество запросов не зависит от длины
+        истории цен в ответе.
+        """
+        first_date = CurrencyPrice.objects.filter(
+            currency=self.currency
+        ).earliest('date').date
+
+        def grow() -> None:
+            nonlocal first_date
+            for _ in range(3):
+                first_date -= datetime.timedelta(days=1)
+                CurrencyPriceFactory(date=first_date, currency=self.currency)
+
+        def request() -> None:
+            response = self.client.get(self.url, {'threshold': 50})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertConstantQueries(request=request, grow=grow)
+
+    def test_summary_constant_queries(self) -> None:
+        """
+        Проверяет, что количество запросов сводки не зависит от длины
+        истории цен.
+        """
+        url = reverse(
+            'currency:analytics-summary',
+            kwargs={'id': self.currency.id}
+        )
+        first_date = CurrencyPrice.objects.filter(
+            currency=self.currency
+        ).earliest('date').date
+
+        def grow() -> None:
+            nonlocal first_date
+            for _ in range(3):
+                first_date -= datetime.timedelta(days=1)
+                CurrencyPriceFactory(date=first_date, currency=self.currency)
+
+        def request() -> None:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertConstantQueries(request=request, grow=grow)
+
     def median_price(self, currency: Currency) -> Decimal:
         """
         Вычисляет медиану цены валюты.
@@ -309,3 +708,288 @@ class AnalyticsViewTestCase(UsersSetupMixin,
         position = int(round(count / 2))
 
         return values[position]
+
+
+class BatchAnalyticsViewTestCase(QueryCountMixin,
+                                 UsersSetupMixin,
+                                 CurrencyPricesSetupMixin,
+                                 APITestCase):
+    """Кейс для api получения аналитики по нескольким валютам."""
+
+    url = reverse('currency:batch-analytics')
+
+    user: User
+    user_currencies: t.List[Currency]
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        super().setUpTestData()
+
+        # noinspection PyUnresolvedReferences
+        cls.user_currencies = cls.currencies[:2]
+        for currency in cls.user_currencies:
+            UserCurrencyFactory(user=cls.user, currency=currency)
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+        cache.clear()
+
+    def test_authentication_required(self) -> None:
+        """Проверяет необходимость авторизации для доступа к эндпоинту"""
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_batch_analytics(self) -> None:
+        """
+        Проверяет колонки дат и цен по переданным валютам и то, что сводка
+        совпадает со сводкой api аналитики одной валюты.
+        """
+        today = datetime.date.today()
+        currencies = self.currencies[2:5]
+        params = {
+            'ids': ','.join(str(x.id) for x in currencies),
+            'date_from': (today - datetime.timedelta(days=5)).isoformat(),
+        }
+
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        data = response.json()['currencies']
+        self.assertEqual(
+            [x['id'] for x in data],
+            sorted(x.id for x in currencies),
+        )
+        for item in data:
+            prices = CurrencyPrice.objects.filter(
+                currency_id=item['id'], date__gte=params['date_from']
+            ).order_by('date')
+            currency = Currency.objects.get(id=item['id'])
+
+            self.assertEqual(item['charcode'], currency.char_code)
+            self.assertEqual(
+                item['dates'], [x.date.isoformat() for x in prices]
+            )
+            self.assertEqual(item['values'], [float(x.value) for x in prices])
+
+            url = reverse(
+                'currency:analytics-summary',
+                kwargs={'id': item['id']}
+            )
+            summary = self.client.get(url, params).json()
+            self.assertEqual(summary.keys(), item['summary'].keys())
+            for key, value in summary.items():
+                if isinstance(value, float):
+                    self.assertAlmostEqual(item['summary'][key], value)
+                else:
+                    self.assertEqual(item['summary'][key], value)
+
+    def test_tracked_currencies(self) -> None:
+        """
+        Проверяет, что без списка id выбираются отслеживаемые валюты,
+        а если их нет - все валюты.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(
+            [x['id'] for x in response.json()['currencies']],
+            sorted(x.id for x in self.user_currencies),
+        )
+
+        self.client.force_authenticate(self.create_user())
+        response = self.client.get(self.url)
+        self.assertEqual(
+            [x['id'] for x in response.json()['currencies']],
+            sorted(x.id for x in self.currencies),
+        )
+
+    def test_ids(self) -> None:
+        """
+        Проверяет, что пустой список id равносилен его отсутствию,
+        а количество валют в запросе ограничено.
+        """
+        response = self.client.get(self.url, {'ids': ''})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [x['id'] for x in response.json()['currencies']],
+            sorted(x.id for x in self.user_currencies),
+        )
+
+        ids = range(1, const.batch_analytics_max_ids + 2)
+        response = self.client.get(
+            self.url, {'ids': ','.join(str(x) for x in ids)}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ids', response.json())
+
+    def test_max_points(self) -> None:
+        """Проверяет прореживание ряда каждой валюты."""
+        response = self.client.get(self.url, {'max_points': 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        for item in response.json()['currencies']:
+            self.assertEqual(len(item['dates']), 4)
+            self.assertEqual(len(item['values']), 4)
+            self.assertIn(item['summary']['max'], item['values'])
+            self.assertIn(item['summary']['min'], item['values'])
+            self.assertEqual(item['summary']['count'], self.price_history_days)
+
+    def test_constant_queries(self) -> None:
+        """
+        Проверяет, что количество запросов не зависит от количества
+        валют и длины истории цен.
+        """
+        first_date = CurrencyPrice.objects.earliest('date').date
+        currencies = iter(self.currencies[2:])
+
+        def grow() -> None:
+            nonlocal first_date
+            first_date -= datetime.timedelta(days=1)
+            for currency in self.currencies:
+                CurrencyPriceFactory(date=first_date, currency=currency)
+            UserCurrencyFactory(user=self.user, currency=next(currencies))
+
+        def request() -> None:
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertConstantQueries(request=request, grow=grow)
+
+
+class ConvertViewTestCase(QueryCountMixin,
+                          CurrencyPricesSetupMixin,
+                          APITestCase):
+    """Кейс для api конвертации валют и матрицы кросс-курсов."""
+
+    convert_url = reverse('currency:convert')
+    cross_rates_url = reverse('currency:cross-rates')
+
+    codes: t.List[str]
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        super().setUpTestData()
+
+        # noinspection PyUnresolvedReferences
+        cls.codes = [
+            x.char_code for x in cls.currencies if x.char_code != 'RUB'
+        ][:3]
+
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+
+    def get_rub_price(self, code: str, day: datetime.date = None) -> float:
+        """Цена единицы валюты в рублях за дату (по умолчанию - сегодня)."""
+        price = CurrencyPrice.objects.get(
+            currency__char_code=code, date=day or datetime.date.today()
+        )
+        return float(price.value) / price.nominal
+
+    def test_convert(self) -> None:
+        """
+        Проверяет конвертацию между валютами по последним котировкам
+        и за дату, без запросов к БД после построения таблицы курсов.
+        """
+        source, target = self.codes[:2]
+        params = {'from': source, 'to': target, 'amount': 250}
+
+        response = self.client.get(self.convert_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        data = response.json()
+        rate = self.get_rub_price(source) / self.get_rub_price(target)
+        self.assertEqual(data['date'], datetime.date.today().isoformat())
+        self.assertAlmostEqual(data['rate'], rate)
+        self.assertAlmostEqual(data['result'], 250 * rate)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.convert_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        day = datetime.date.today() - datetime.timedelta(days=3)
+        data = self.client.get(
+            self.convert_url, {'from': source, 'to': 'RUB', 'date': day}
+        ).json()
+        self.assertEqual(data['date'], day.isoformat())
+        self.assertAlmostEqual(
+            data['result'], self.get_rub_price(source, day)
+        )
+
+    def test_convert_errors(self) -> None:
+        """Проверяет ошибки для неизвестной валюты и даты без котировок."""
+        response = self.client.get(
+            self.convert_url, {'from': self.codes[0], 'to': 'XXX'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('to', response.json())
+
+        response = self.client.get(self.convert_url, {'to': self.codes[0]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('from', response.json())
+
+        response = self.client.get(self.convert_url, {
+            'from': self.codes[0], 'to': self.codes[1], 'date': '2000-01-01',
+        })
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cross_rates(self) -> None:
+        """Проверяет матрицу кросс-курсов для выбранных и всех валют."""
+        response = self.client.get(
+            self.cross_rates_url, {'codes': ','.join(self.codes)}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        data = response.json()
+        self.assertEqual(data['codes'], self.codes)
+        for i, source in enumerate(self.codes):
+            for j, target in enumerate(self.codes):
+                self.assertAlmostEqual(
+                    data['rates'][i][j],
+                    self.get_rub_price(source) / self.get_rub_price(target),
+                )
+
+        data = self.client.get(self.cross_rates_url).json()
+        self.assertEqual(
+            set(data['codes']),
+            {x.char_code for x in self.currencies} | {'RUB'},
+        )
+        self.assertEqual(len(data['rates']), len(data['codes']))
+
+        response = self.client.get(self.cross_rates_url, {'codes': 'XXX'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def grow_currencies(self) -> None:
+        """Добавляет валюты с котировками за сегодня."""
+        self.create_price_history(self.create_currencies(3), days=1)
+
+    def test_convert_constant_queries(self) -> None:
+        """
+        Проверяет, что количество запросов конвертации не зависит
+        от количества валют.
+        """
+        source, target = self.codes[:2]
+
+        def request() -> None:
+            response = self.client.get(
+                self.convert_url, {'from': source, 'to': target}
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertConstantQueries(
+            request=request, grow=self.grow_currencies
+        )
+
+    def test_cross_rates_constant_queries(self) -> None:
+        """
+        Проверяет, что количество запросов матрицы кросс-курсов
+        по всем валютам не зависит от количества валют.
+        """
+        def request() -> None:
+            response = self.client.get(self.cross_rates_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertConstantQueries(
+            request=request, grow=self.grow_currencies
+        )
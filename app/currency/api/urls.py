@@ -10,11 +10,31 @@ urlpatterns = [
         views.UserCurrencyCreateView.as_view(),
         name='user-currency'
     ),
+    path(
+        'currency/analytics/',
+        views.BatchAnalyticsView.as_view(),
+        name='batch-analytics'
+    ),
     path(
         'currency/<int:id>/analytics/',
         views.AnalyticsView.as_view(),
         name='analytics'
     ),
+    path(
+        'currency/<int:id>/analytics/summary/',
+        views.AnalyticsSummaryView.as_view(),
+        name='analytics-summary'
+    ),
+    path(
+        'currency/convert/',
+        views.ConvertView.as_view(),
+        name='convert'
+    ),
+    path(
+        'currency/cross-rates/',
+        views.CrossRatesView.as_view(),
+        name='cross-rates'
+    ),
     path(
         'rates/',
         views.RatesView.as_view(),
@@ -1,22 +1,38 @@
+import datetime
 import typing as t
+from itertools import groupby
+from operator import itemgetter
 
 from django.contrib.auth.models import AbstractUser, AnonymousUser
-from django.core.cache import cache
-from django.db.models import (Case, DecimalField, ExpressionWrapper, F, Max,
-                              Min, Q, QuerySet, Subquery, Value, When, Window)
+from django.db.models import (Case, Count, DecimalField, ExpressionWrapper,
+                              F, Max, Min, Q, QuerySet, Value, When)
 from django.http import HttpRequest
-from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import generics, permissions
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.fields import IntegerField
 from rest_framework.filters import OrderingFilter
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
 
 from app.currency.api import const, serializers
-from app.currency.api.filters import DateRangeFilter
-from app.currency.models import CurrencyPrice, UserCurrency
-from app.tools.helpers import cache_per_user
+from app.currency.api.filters import (AnalyticsFilter, BatchAnalyticsFilter,
+                                      DateRangeFilter)
+from app.currency.api.pagination import AnalyticsCursorPagination
+from app.currency.cross_rates import RateTable, rate_tables
+from app.currency.downsampling import downsample_prices
+from app.currency.helpers import (api_cache_generation, get_prices_summary,
+                                  get_series_summary, get_user_currency_ids)
+from app.currency.models import (CurrencyPrice, CurrencyPriceRollup,
+                                 LatestCurrencyPrice, UserCurrency)
+from app.currency.registry import currency_registry
+from app.tools.helpers import cache_get_or_fill
+
+# строка общего списка котировок в кеше: (id валюты, дата, код валюты, цена)
+RateRow = t.Tuple[int, str, str, float]
 
 
 class UserCurrencyCreateView(generics.CreateAPIView):
@@ -47,63 +63,92 @@ class RatesView(generics.ListAPIView):
     def get_queryset(self) -> QuerySet:
         """
         Возвращает qs с последними загруженными котировками
-        для каждой валюты.
-        """
-        return CurrencyPrice.objects.filter(
-            pk__in=Subquery(
-                CurrencyPrice.objects
-                  .order_by('currency_id')
-                  .distinct('currency_id')
-                  .values('pk')
-            )
-        ).order_by('currency_id', '-date')
+        для каждой валюты. Читает денормализованную таблицу
+        с одной строкой на валюту, поэтому не зависит от длины истории цен.
+        """
+        return LatestCurrencyPrice.objects.order_by('currency_id')
 
-    @method_decorator(cache_per_user(const.cache_timeout))
     def list(self, request: HttpRequest, *args, **kwargs) -> Response:
         """
         Возвращает ответ api со списком последних загруженных котировок,
         отфильтрованных по списку валют пользователя.
         Используется 2 уровня кеша:
-        - кеш для полного списка последних котировок (одинаков для всех пользователей);
-        - кеш ответа для каждого пользователя (декоратор);
-        Оба кеша учитывают параметры запроса.
-        """
-        cache_key = f'{const.rates_cache_key}:{request.get_full_path()}'
-        rates = cache.get(key=cache_key)
-        if rates is None:
-            # в кеше пусто, заполняем кеш
-            qs = self.filter_queryset(self.get_queryset())
-            rates = list(qs)
-            cache.set(key=cache_key, value=rates)
+        - кеш для полного списка последних котировок (одинаков для всех
+        пользователей), учитывает параметры запроса и поколение кеша api;
+        - кеш списка id отслеживаемых валют для каждого пользователя,
+        сбрасывается при изменении списка валют пользователя;
+        Ответ пользователя собирается из них при каждом запросе, поэтому
+        в кеше не хранится копия котировок на каждого пользователя.
+        Общий список заполняется в единственном экземпляре: после сброса
+        кеша запрос к БД выполняет один воркер, а остальные получают
+        прежние данные.
+        """
+        path = request.get_full_path()
+        rates = cache_get_or_fill(
+            key=f'{const.rates_cache_key}:{api_cache_generation.get()}:{path}',
+            fill=self._load_rates,
+            timeout=const.rates_cache_timeout,
+            stale_key=f'{const.rates_cache_key}:stale:{path}',
+        )
 
         rates = self._filter_by_user(rates, self.request.user)
 
-        serializer = self.get_serializer(rates, many=True)
-        return Response(serializer.data)
+        fields = self.get_serializer_class().Meta.fields
+        return Response([dict(zip(fields, x)) for x in rates])
+
+    def _load_rates(self) -> t.List[RateRow]:
+        """
+        Загружает общий список котировок в виде компактных строк,
+        уже приведенных к формату ответа api (поля RatesSerializer).
+        В кеше не хранятся объекты моделей, а при попадании в кеш
+        не нужны ни ORM, ни сериалайзер.
+        """
+        qs = self.filter_queryset(self.get_queryset()).values_list(
+            'currency_id', 'date', 'currency__char_code', 'value'
+        )
+        return [
+            (currency_id, d.isoformat(), char_code, float(value))
+            for currency_id, d, char_code, value in qs
+        ]
 
     @staticmethod
     def _filter_by_user(
-        rates: t.List[CurrencyPrice],
+        rates: t.List[RateRow],
         user: t.Type[AbstractUser] | AnonymousUser,
-    ) -> t.List[CurrencyPrice]:
+    ) -> t.List[RateRow]:
         """
         Фильтрует список котировок по списку валют пользователя.
         Для анонимного пользователя возвращает полный список.
         Если в списке валют пользователя пусто, то возвращает все котировки.
+        Множество валют пользователя берется из кеша, поэтому фильтрация -
+        пересечение с множеством без запросов к БД (порядок общего списка
+        сохраняется).
         """
         if user.is_authenticated:
-            tracked = (
-                UserCurrency.objects
-                  .filter(user=user)
-                  .values_list('currency_id', flat=True)
-            )
+            tracked = get_user_currency_ids(user.id)
             if tracked:
-                rates = [
-                    x for x in rates if x.currency_id in tracked
-                ]
+                rates = [x for x in rates if x[0] in tracked]
         return rates
 
 
+class MaxPointsMixin:
+    """Миксин с разбором параметра прореживания выборки max_points."""
+    request: Request
+
+    def get_max_points(self) -> t.Optional[int]:
+        """
+        Максимальное количество котировок в ответе из запроса:
+        не меньше 4 - первая, последняя, максимальная и минимальная.
+        """
+        value = self.request.query_params.get('max_points')
+        if value is None:
+            return None
+        try:
+            return IntegerField(min_value=4).run_validation(value)
+        except ValidationError as e:
+            raise ValidationError({'max_points': e.detail})
+
+
 @extend_schema(
     parameters=[
         OpenApiParameter(
@@ -113,6 +158,22 @@ class RatesView(generics.ListAPIView):
             type=OpenApiTypes.NUMBER,
             location=OpenApiParameter.QUERY,
         ),
+        OpenApiParameter(
+            name='max_points',
+            description='Максимальное количество котировок в ответе '
+                        '(выборка прореживается с сохранением формы графика)',
+            required=False,
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name='interval',
+            description='Шаг выборки: по дням или свертки за неделю/месяц',
+            required=False,
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            enum=['day', 'week', 'month'],
+        ),
         OpenApiParameter(
             name='date_from',
             description='Начальная дата выборки',
@@ -136,25 +197,107 @@ class RatesView(generics.ListAPIView):
         ),
     ]
 )
-class AnalyticsView(generics.ListAPIView):
+class AnalyticsView(MaxPointsMixin, generics.ListAPIView):
     """API для отображения аналитики по конкретной валюте."""
     serializer_class = serializers.AnalyticsSerializer
     filter_backends = (DjangoFilterBackend,)
-    filterset_class = DateRangeFilter
+    filterset_class = AnalyticsFilter
+    pagination_class = AnalyticsCursorPagination
     permission_classes = (permissions.IsAuthenticated,)
 
+    @property
+    def interval(self) -> t.Optional[str]:
+        """Шаг сверток истории цен из запроса (None - выборка по дням)."""
+        interval = self.request.query_params.get('interval')
+        if interval in CurrencyPriceRollup.Interval.values:
+            return interval
+        return None
+
     def get_queryset(self) -> QuerySet:
         """
-        Фильтрует qs с ценами по id валюты, а также
-        обогащает его данными для аналитики.
+        Фильтрует qs с ценами по id валюты. Если задан шаг выборки
+        неделя или месяц, то вместо дневных цен выбираются их свертки.
         """
         currency_id = self.kwargs.get('id')
-        qs = CurrencyPrice.objects.filter(
-           currency_id=currency_id
+        if self.interval:
+            qs = CurrencyPriceRollup.objects.filter(
+                currency_id=currency_id, interval=self.interval
+            )
+        else:
+            qs = CurrencyPrice.objects.filter(currency_id=currency_id)
+
+        return qs.select_related('currency').order_by('-date', '-id')
+
+    def get_serializer_class(self) -> t.Type[BaseSerializer]:
+        """Возвращает сериалайзер сверток, если задан шаг выборки."""
+        if self.interval:
+            return serializers.AnalyticsRollupSerializer
+        return super().get_serializer_class()
+
+    def filter_queryset(self, queryset: QuerySet) -> QuerySet:
+        """
+        Фильтрует qs по интервалу дат и обогащает qs данными для аналитики
+        (для сверток аналитика по строкам не вычисляется).
+        Полная сводка по дневным ценам выборки выдается только вместе
+        со страницей, поэтому вычисляется только при пагинации;
+        иначе считаются лишь количество и экстремумы выборки.
+        """
+        queryset = super().filter_queryset(queryset)
+        self.summary = None
+        paginated = (
+            self.paginator is not None
+            and self.paginator.get_page_size(self.request)
         )
-        qs = self._add_analytics(qs)
+        if self.interval:
+            if paginated:
+                currency_id = self.kwargs.get('id')
+                prices = DateRangeFilter(
+                    self.request.query_params,
+                    CurrencyPrice.objects.filter(currency_id=currency_id),
+                ).qs
+                self.summary = get_prices_summary(prices)
+            return queryset
 
-        return qs
+        if paginated:
+            self.summary = extremes = get_prices_summary(queryset)
+        else:
+            extremes = queryset.order_by().aggregate(
+                count=Count('id'), min=Min('value'), max=Max('value')
+            )
+        max_points = self.get_max_points()
+        if max_points:
+            queryset = self._downsample(queryset, max_points, extremes)
+        queryset = self._add_analytics(queryset)
+        return self._add_min_max(queryset, extremes)
+
+    def get_paginated_response(self, data: t.List[dict]) -> Response:
+        """Добавляет в ответ со страницей выборки сводку по всей выборке."""
+        response = super().get_paginated_response(data)
+        response.data['summary'] = serializers.AnalyticsSummarySerializer(
+            self.summary
+        ).data
+        return response
+
+    @staticmethod
+    def _downsample(
+        queryset: QuerySet,
+        max_points: int,
+        extremes: t.Dict[str, t.Any],
+    ) -> QuerySet:
+        """
+        Прореживает выборку до max_points котировок алгоритмом LTTB,
+        сохраняя максимальную и минимальную котировки. Ряд (дата, цена)
+        читается из покрывающего индекса, а затем выбираются только
+        отобранные строки.
+        """
+        if extremes['count'] <= max_points:
+            return queryset
+
+        series = downsample_prices(
+            list(queryset.order_by('date').values_list('date', 'value')),
+            max_points,
+        )
+        return queryset.filter(date__in=[d for d, _ in series])
 
     def _add_analytics(self, queryset: QuerySet) -> QuerySet:
         """Добавляет аналитические данные в qs."""
@@ -182,17 +325,274 @@ class AnalyticsView(generics.ListAPIView):
                 )
             )
 
-        # признак максимальной и минимальной котировки в выборке
-        max_value_expr = Window(
-            expression=Max('value'),
-            partition_by=(F('currency_id'),)
+        return queryset
+
+    @staticmethod
+    def _add_min_max(
+        queryset: QuerySet,
+        extremes: t.Dict[str, t.Any],
+    ) -> QuerySet:
+        """
+        Добавляет в qs признаки максимальной и минимальной котировки
+        в выборке. Экстремумы посчитаны одним запросом по всей выборке,
+        поэтому строки не сравниваются с окном и признаки верны
+        и при выдаче выборки по страницам.
+        """
+        return queryset.annotate(
+            is_max_value=Q(value=Value(extremes['max'])),
+            is_min_value=Q(value=Value(extremes['min'])),
         )
-        min_value_expr = Window(
-            expression=Min('value'),
-            partition_by=(F('currency_id'),)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='date_from',
+            description='Начальная дата выборки',
+            required=False,
+            type=OpenApiTypes.DATE,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name='date_to',
+            description='Конечная дата выборки',
+            required=False,
+            type=OpenApiTypes.DATE,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name='id',
+            description='id валюты',
+            required=True,
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.PATH,
+        ),
+    ]
+)
+class AnalyticsSummaryView(generics.GenericAPIView):
+    """
+    API для отображения сводки по истории цен конкретной валюты
+    без самой истории.
+    """
+    serializer_class = serializers.AnalyticsSummarySerializer
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = DateRangeFilter
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self) -> QuerySet:
+        """Фильтрует qs с ценами по id валюты."""
+        return CurrencyPrice.objects.filter(currency_id=self.kwargs.get('id'))
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> Response:
+        """Возвращает сводку по отфильтрованной по датам выборке цен."""
+        summary = get_prices_summary(self.filter_queryset(self.get_queryset()))
+        return Response(self.get_serializer(summary).data)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='ids',
+            description='id валют через запятую (по умолчанию - '
+                        'отслеживаемые пользователем валюты)',
+            required=False,
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name='max_points',
+            description='Максимальное количество котировок на валюту '
+                        '(выборка прореживается с сохранением формы графика)',
+            required=False,
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name='date_from',
+            description='Начальная дата выборки',
+            required=False,
+            type=OpenApiTypes.DATE,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name='date_to',
+            description='Конечная дата выборки',
+            required=False,
+            type=OpenApiTypes.DATE,
+            location=OpenApiParameter.QUERY,
+        ),
+    ]
+)
+class BatchAnalyticsView(MaxPointsMixin, generics.GenericAPIView):
+    """
+    API для отображения истории цен нескольких валют одним запросом
+    в компактном колоночном формате.
+    """
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = BatchAnalyticsFilter
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self) -> QuerySet:
+        """
+        Возвращает qs с ценами, упорядоченный по валюте и дате.
+        Если список id валют не передан или пуст, выбираются валюты,
+        отслеживаемые пользователем (если их нет - все валюты).
+        """
+        qs = CurrencyPrice.objects.order_by('currency_id', 'date')
+        if not self.request.query_params.get('ids'):
+            tracked = get_user_currency_ids(self.request.user.id)
+            if tracked:
+                qs = qs.filter(currency_id__in=tracked)
+        return qs
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> Response:
+        """
+        Возвращает для каждой валюты колонки дат и цен и сводку
+        по выборке. Ряды всех валют читаются одним запросом и разбиваются
+        по валютам на лету; коды валют берутся из реестра валют.
+        Валюты без котировок в интервале дат в ответ не попадают.
+        """
+        max_points = self.get_max_points()
+        rows = self.filter_queryset(self.get_queryset()).values_list(
+            'currency_id', 'date', 'value'
         )
+        char_codes = currency_registry.get_char_codes()
 
-        return queryset.annotate(
-            is_max_value=Q(value=max_value_expr),
-            is_min_value=Q(value=min_value_expr),
+        currencies = []
+        for currency_id, group in groupby(rows.iterator(), key=itemgetter(0)):
+            series = [(d, value) for _, d, value in group]
+            summary = get_series_summary(series)
+            if max_points:
+                series = downsample_prices(series, max_points)
+
+            currencies.append({
+                'id': currency_id,
+                'charcode': char_codes.get(currency_id),
+                'dates': [d.isoformat() for d, _ in series],
+                'values': [float(x) for _, x in series],
+                'summary': serializers.AnalyticsSummarySerializer(
+                    summary
+                ).data,
+            })
+        return Response({'currencies': currencies})
+
+
+def get_rate_table(day: t.Optional[datetime.date]) -> RateTable:
+    """Возвращает таблицу курсов за дату или ошибку 404, если котировок нет."""
+    table = rate_tables.get(day)
+    if table is None:
+        raise NotFound('Нет котировок за указанную дату.')
+    return table
+
+
+def check_char_codes(
+    table: RateTable, field: str, char_codes: t.List[str]
+) -> None:
+    """Проверяет, что для всех валют есть курс в таблице."""
+    unknown = [x for x in char_codes if x not in table.index]
+    if unknown:
+        raise ValidationError(
+            {field: f'Нет курса для валют: {", ".join(unknown)}.'}
         )
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='from',
+            description='Код исходной валюты',
+            required=True,
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name='to',
+            description='Код валюты, в которую переводится сумма',
+            required=True,
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name='amount',
+            description='Сумма (по умолчанию 1)',
+            required=False,
+            type=OpenApiTypes.NUMBER,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name='date',
+            description='Дата курса (по умолчанию - последние котировки)',
+            required=False,
+            type=OpenApiTypes.DATE,
+            location=OpenApiParameter.QUERY,
+        ),
+    ]
+)
+class ConvertView(generics.GenericAPIView):
+    """API для конвертации суммы между любыми двумя валютами."""
+    serializer_class = serializers.ConvertSerializer
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> Response:
+        """
+        Переводит сумму по кросс-курсу за дату. Курсы берутся из таблицы
+        курсов в памяти процесса, без запросов к БД.
+        """
+        params = self.get_serializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+
+        table = get_rate_table(params.get('date'))
+        for field in ('from', 'to'):
+            check_char_codes(table, field, [params[field]])
+
+        rate = table.rate(params['from'], params['to'])
+        return Response({
+            'from': params['from'],
+            'to': params['to'],
+            'date': table.date,
+            'amount': params['amount'],
+            'rate': rate,
+            'result': params['amount'] * rate,
+        })
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='codes',
+            description='Коды валют через запятую (по умолчанию - все)',
+            required=False,
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name='date',
+            description='Дата курсов (по умолчанию - последние котировки)',
+            required=False,
+            type=OpenApiTypes.DATE,
+            location=OpenApiParameter.QUERY,
+        ),
+    ]
+)
+class CrossRatesView(generics.GenericAPIView):
+    """API для отображения матрицы кросс-курсов валют за дату."""
+    serializer_class = serializers.CrossRatesSerializer
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> Response:
+        """
+        Возвращает матрицу кросс-курсов: rates[i][j] - стоимость
+        одной единицы i-й валюты из codes в единицах j-й.
+        """
+        params = self.get_serializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+
+        table = get_rate_table(params.get('date'))
+        codes = params.get('codes') or table.char_codes
+        check_char_codes(table, 'codes', codes)
+
+        return Response({
+            'date': table.date,
+            'codes': codes,
+            'rates': table.matrix(codes),
+        })
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CurrencyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app.currency'
+
+    def ready(self) -> None:
+        from app.currency import signals  # noqa: F401
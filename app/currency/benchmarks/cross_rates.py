@@ -0,0 +1,51 @@
+"""
+Конвертация валют по таблице курсов (api конвертации и кросс-курсов):
+размер таблицы в общем кеше, время ее восстановления из кеша
+(один раз на процесс и поколение кеша), время расчета одного кросс-курса
+и матрицы N x N.
+"""
+import datetime
+import random
+from array import array
+
+from django.core.cache.backends.redis import RedisSerializer
+
+from app.currency.benchmarks.helpers import format_table, measure
+from app.currency.cross_rates import RateTable
+
+# количество валют в ответе сервиса котировок
+CURRENCIES_COUNT = 43
+
+
+def run(size: int = 100_000) -> str:
+    """Запускает бенчмарк на size конвертациях."""
+    rnd = random.Random(0)
+    serializer = RedisSerializer()
+
+    codes = ['RUB'] + [f'C{i:02d}' for i in range(CURRENCIES_COUNT)]
+    table = RateTable(
+        day=datetime.date.today(),
+        char_codes=codes,
+        rates=array('d', [1.0] + [
+            rnd.uniform(0.01, 200) for _ in range(CURRENCIES_COUNT)
+        ]),
+    )
+    pairs = [tuple(rnd.sample(codes, 2)) for _ in range(size)]
+    blob = serializer.dumps(table.dumps())
+    # та же таблица в виде словаря {(валюта, валюта): курс}
+    matrix_blob = serializer.dumps({
+        (x, y): table.rate(x, y) for x in codes for y in codes
+    })
+
+    rows = [('operation', 'value')]
+    rows.append(('cache value, bytes', len(blob)))
+    rows.append(('N x N dict in cache, bytes', len(matrix_blob)))
+    load = measure(lambda: RateTable.loads(serializer.loads(blob)))
+    rows.append(('load from cache, us', f'{load * 1e6:.1f}'))
+    convert = measure(lambda: [table.rate(x, y) for x, y in pairs]) / size
+    rows.append(('convert, us', f'{convert * 1e6:.3f}'))
+    rows.append((
+        f'{len(codes)} x {len(codes)} matrix, us',
+        f'{measure(lambda: table.matrix(codes)) * 1e6:.1f}',
+    ))
+    return format_table(rows)
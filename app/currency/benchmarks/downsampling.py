@@ -0,0 +1,67 @@
+"""
+Прореживание истории цен для графиков (параметр max_points api аналитики):
+размер ответа и время рендеринга json для полной истории
+и для прореживания LTTB до разного количества точек,
+а также время самого прореживания.
+"""
+import datetime
+import random
+
+from rest_framework.renderers import JSONRenderer
+
+from app.currency.benchmarks.helpers import format_table, measure
+from app.currency.downsampling import lttb
+
+# количество точек в ответе после прореживания
+MAX_POINTS = (2000, 500, 100)
+
+
+def run(size: int = 10_000) -> str:
+    """Запускает бенчмарк на истории цен из size дней."""
+    rnd = random.Random(0)
+    renderer = JSONRenderer()
+    first_date = datetime.date.today() - datetime.timedelta(days=size)
+
+    # случайное блуждание цены
+    values = [100.0]
+    for _ in range(size - 1):
+        values.append(max(1.0, values[-1] + rnd.gauss(0, 1)))
+    dates = [first_date + datetime.timedelta(days=i) for i in range(size)]
+    xs = [x.toordinal() for x in dates]
+    keep = [values.index(max(values)), values.index(min(values))]
+
+    def response(indexes: list) -> list:
+        """Строки ответа api аналитики для выбранных точек."""
+        return [
+            {
+                'id': 1,
+                'date': dates[i].isoformat(),
+                'charcode': 'USD',
+                'value': round(values[i], 4),
+                'is_max_value': i == keep[0],
+                'is_min_value': i == keep[1],
+                'threshold_match_type': 'no threshold',
+                'percentage_ratio': None,
+            }
+            for i in indexes
+        ]
+
+    rows = [('points', 'bytes', 'render, ms', 'lttb, ms')]
+    full = response(range(size))
+    rows.append((
+        size,
+        len(renderer.render(full)),
+        f'{measure(lambda: renderer.render(full)) * 1e3:.2f}',
+        '-',
+    ))
+    for max_points in MAX_POINTS:
+        if max_points >= size:
+            continue
+        data = response(lttb(xs, values, max_points, keep))
+        rows.append((
+            max_points,
+            len(renderer.render(data)),
+            f'{measure(lambda: renderer.render(data)) * 1e3:.2f}',
+            f'{measure(lambda: lttb(xs, values, max_points, keep)) * 1e3:.2f}',
+        ))
+    return format_table(rows)
@@ -0,0 +1,54 @@
+import time
+import typing as t
+
+from faker import Faker
+
+fake = Faker()
+
+
+def measure(func: t.Callable, repeat: int = 5) -> float:
+    """Возвращает лучшее время выполнения функции в секундах."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def format_table(rows: t.List[t.Tuple]) -> str:
+    """Форматирует строки результатов бенчмарка в текстовую таблицу."""
+    widths = [max(len(str(x)) for x in column) for column in zip(*rows)]
+    return '\n'.join(
+        '  '.join(str(x).ljust(w) for x, w in zip(row, widths))
+        for row in rows
+    )
+
+
+def gen_api_payload(
+    char_codes: t.List[str], day: t.Any = None
+) -> t.Dict[str, t.Any]:
+    """Генерирует ответ api с котировками в формате cbr-xml-daily.ru."""
+    day = day or fake.date_object()
+    return {
+        'Date': f'{day.isoformat()}T11:30:00+03:00',
+        'PreviousDate': fake.date_time().isoformat(),
+        'PreviousURL': fake.url(),
+        'Timestamp': fake.date_time().isoformat(),
+        'Valute': {
+            code: {
+                'ID': fake.pystr(max_chars=7),
+                'NumCode': str(fake.pyint(max_value=1000)),
+                'CharCode': code,
+                'Nominal': 1,
+                'Name': fake.pystr(max_chars=30),
+                'Value': fake.pyfloat(
+                    right_digits=4, min_value=1, max_value=200
+                ),
+                'Previous': fake.pyfloat(
+                    right_digits=4, min_value=1, max_value=200
+                ),
+            }
+            for code in char_codes
+        },
+    }
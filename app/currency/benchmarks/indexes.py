@@ -0,0 +1,164 @@
+"""
+Планы и время запросов к истории цен до и после индексов
+currencyprice_currency_date (покрывающий) и currencyprice_date_brin.
+Бенчмарк заполняет таблицу синтетической историей и выполняется
+в транзакции, которая в конце откатывается: данные в БД не меняются.
+"""
+import datetime
+import json
+import typing as t
+
+from django.db import connection, transaction
+from django.db.models import QuerySet
+
+from app.currency.benchmarks.helpers import format_table
+from app.currency.models import Currency, CurrencyPrice
+
+# количество синтетических валют
+CURRENCIES_COUNT = 50
+# префикс кодов синтетических валют, не пересекается с настоящими
+CHAR_CODE_PREFIX = '#'
+
+
+class Rollback(Exception):
+    """Исключение для отката транзакции бенчмарка."""
+
+
+def run(size: int = 2_000_000) -> str:
+    """Запускает бенчмарк на таблице из size синтетических котировок."""
+    days = size // CURRENCIES_COUNT
+    start = datetime.date(1970, 1, 1)
+
+    results = dict()
+    try:
+        with transaction.atomic():
+            currency_id = _seed(days, start)
+
+            queries = _queries(currency_id, start, days)
+            indexes = [
+                x for x in CurrencyPrice._meta.indexes
+                if x.name in (
+                    'currencyprice_currency_date', 'currencyprice_date_brin'
+                )
+            ]
+
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.remove_index(CurrencyPrice, index)
+            _analyze()
+            results['before'] = {k: _explain(qs) for k, qs in queries.items()}
+
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.add_index(CurrencyPrice, index)
+            _analyze()
+            results['after'] = {k: _explain(qs) for k, qs in queries.items()}
+
+            raise Rollback
+    except Rollback:
+        pass
+
+    rows = [('query', 'before', 'ms', 'after', 'ms')]
+    for name in queries:
+        before_plan, before_ms = results['before'][name]
+        after_plan, after_ms = results['after'][name]
+        rows.append((
+            name, before_plan, f'{before_ms:.2f}', after_plan, f'{after_ms:.2f}'
+        ))
+    return f'rows: {days * CURRENCIES_COUNT:,}\n' + format_table(rows)
+
+
+def _seed(days: int, start: datetime.date) -> int:
+    """
+    Создает синтетические валюты и историю цен для них.
+    Возвращает id одной из валют для запросов аналитики.
+    """
+    Currency.objects.bulk_create([
+        Currency(
+            char_code=f'{CHAR_CODE_PREFIX}{i:02d}',
+            name=f'benchmark {i}',
+        )
+        for i in range(CURRENCIES_COUNT)
+    ])
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {CurrencyPrice._meta.db_table} '
+            f'(date, currency_id, value, nominal) '
+            f'SELECT %s::date + d, c.id, '
+            f'round((random() * 100)::numeric, 4), 1 '
+            f'FROM generate_series(0, %s - 1) AS d '
+            f'CROSS JOIN ('
+            f'  SELECT id FROM {Currency._meta.db_table} '
+            f'  WHERE char_code LIKE %s'
+            f') AS c',
+            [start, days, f'{CHAR_CODE_PREFIX}%'],
+        )
+        # проверяем отложенные внешние ключи сразу, иначе postgresql
+        # не даст менять индексы таблицы в этой транзакции
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+    return Currency.objects.filter(
+        char_code=f'{CHAR_CODE_PREFIX}00'
+    ).values_list('id', flat=True).get()
+
+
+def _queries(
+    currency_id: int, start: datetime.date, days: int
+) -> t.Dict[str, QuerySet]:
+    """Запросы, повторяющие основные пути доступа к истории цен."""
+    last = start + datetime.timedelta(days=days - 1)
+    year_ago = last - datetime.timedelta(days=365)
+
+    return {
+        # AnalyticsView: валюта + интервал дат, сортировка по -date
+        'analytics (1 year)': (
+            CurrencyPrice.objects
+              .filter(currency_id=currency_id, date__gte=year_ago)
+              .order_by('-date')
+              .values_list('date', 'value')
+        ),
+        # AnalyticsView без фильтра по датам
+        'analytics (all)': (
+            CurrencyPrice.objects
+              .filter(currency_id=currency_id)
+              .order_by('-date')
+              .values_list('date', 'value')
+        ),
+        # send_threshold_emails: цены за один день
+        'prices by date': (
+            CurrencyPrice.objects
+              .filter(date=last)
+              .values_list('currency_id', 'value')
+        ),
+        # интервал дат по всем валютам
+        'date range (30 days)': (
+            CurrencyPrice.objects
+              .filter(date__gt=last - datetime.timedelta(days=30))
+              .order_by()
+              .values_list('currency_id', 'value')
+        ),
+    }
+
+
+def _analyze() -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {CurrencyPrice._meta.db_table}')
+
+
+def _explain(qs: QuerySet) -> t.Tuple[str, float]:
+    """
+    Возвращает тип верхнего узла плана (без сортировки и объединения
+    партиций) и время выполнения в мс.
+    """
+    result = json.loads(qs.explain(format='json', analyze=True))[0]
+
+    node = result['Plan']
+    skipped = ('Sort', 'Gather', 'Gather Merge', 'Append', 'Merge Append')
+    while node['Node Type'] in skipped:
+        node = node['Plans'][0]
+
+    plan = node['Node Type']
+    if node.get('Index Name'):
+        plan += f' ({node["Index Name"]})'
+    return plan, result['Execution Time']
@@ -0,0 +1,67 @@
+"""
+Сравнение скорости разбора ответов сервиса котировок:
+- прежний путь: stdlib json + создание модели CurrencyPrice на каждую валюту;
+- быстрый путь: orjson (если установлен) + строки-кортежи для вставки в БД.
+"""
+import json
+from datetime import date, datetime, timedelta
+
+from app.currency.benchmarks.helpers import (format_table, gen_api_payload,
+                                             measure)
+from app.currency.cbr_client import CbrDailyApiClient, orjson
+from app.currency.models import Currency, CurrencyPrice
+
+# количество валют в типичном ответе сервиса
+CURRENCIES_COUNT = 43
+
+
+def run(size: int = 3650) -> str:
+    """Запускает бенчмарк на size днях архива."""
+    char_codes = [f'C{i:02d}' for i in range(CURRENCIES_COUNT)]
+    today = date.today()
+    documents = [
+        json.dumps(
+            gen_api_payload(char_codes, today - timedelta(days=i))
+        ).encode()
+        for i in range(size)
+    ]
+
+    currency_models = {
+        code: Currency(id=i, char_code=code, name=code)
+        for i, code in enumerate(char_codes)
+    }
+
+    def legacy_path() -> None:
+        for content in documents:
+            data = json.loads(content)
+            d = datetime.fromisoformat(data['Date']).date()
+            [
+                CurrencyPrice(
+                    date=d,
+                    currency=currency_models[x['CharCode']],
+                    value=x['Value'],
+                )
+                for x in data['Valute'].values()
+            ]
+
+    client = CbrDailyApiClient()
+    client.currencies = {code: i for i, code in enumerate(char_codes)}
+
+    def fast_path() -> None:
+        for content in documents:
+            client._parse_prices(client._decode(content))
+
+    legacy = measure(legacy_path, repeat=3)
+    fast = measure(fast_path, repeat=3)
+
+    rows = size * CURRENCIES_COUNT
+    return format_table([
+        ('path', 'seconds', 'rows/sec'),
+        ('json + models', f'{legacy:.3f}', f'{rows / legacy:,.0f}'),
+        (
+            f'{"orjson" if orjson else "json"} + tuples',
+            f'{fast:.3f}',
+            f'{rows / fast:,.0f}',
+        ),
+        ('speedup', f'{legacy / fast:.1f}x', ''),
+    ])
@@ -0,0 +1,74 @@
+"""
+Время ответа api котировок при попадании в общий кеш: список объектов
+LatestCurrencyPrice (с загруженными валютами) и сериалайзер против
+компактных строк в формате ответа.
+Измеряется разбор значения из кеша, фильтрация по валютам пользователя
+и рендеринг json (без обращения к redis - оно одинаково для обоих вариантов).
+"""
+import datetime
+import random
+from decimal import Decimal
+
+from django.core.cache.backends.redis import RedisSerializer
+from rest_framework.renderers import JSONRenderer
+
+from app.currency.api.serializers import RatesSerializer
+from app.currency.benchmarks.helpers import format_table, measure
+from app.currency.models import Currency, LatestCurrencyPrice
+
+# количество валют в ответе сервиса котировок
+CURRENCIES_COUNT = 43
+# количество отслеживаемых пользователем валют
+TRACKED_COUNT = 5
+
+
+def run(size: int = 1000) -> str:
+    """Запускает бенчмарк на size запросах."""
+    rnd = random.Random(0)
+    serializer = RedisSerializer()
+    renderer = JSONRenderer()
+    today = datetime.date.today()
+
+    prices = [
+        LatestCurrencyPrice(
+            currency=Currency(id=i, char_code=f'C{i:02d}', name=f'{i}'),
+            date=today,
+            value=Decimal(f'{rnd.uniform(1, 200):.4f}'),
+        )
+        for i in range(CURRENCIES_COUNT)
+    ]
+    rows = [
+        (x.currency_id, x.date.isoformat(), x.currency.char_code, float(x.value))
+        for x in prices
+    ]
+    fields = RatesSerializer.Meta.fields
+
+    cases = {
+        'model instances + serializer': (
+            serializer.dumps(prices),
+            lambda rates, tracked: RatesSerializer(
+                [x for x in rates if x.currency_id in tracked], many=True
+            ).data,
+        ),
+        'row tuples': (
+            serializer.dumps(rows),
+            lambda rates, tracked: [
+                dict(zip(fields, x)) for x in rates if x[0] in tracked
+            ],
+        ),
+    }
+
+    user_tracked = frozenset(
+        rnd.sample(range(CURRENCIES_COUNT), TRACKED_COUNT)
+    )
+    results = [('cache value', 'bytes', 'anonymous, us', 'user, us')]
+    for name, (blob, build) in cases.items():
+        timings = [
+            measure(lambda: [
+                renderer.render(build(serializer.loads(blob), tracked))
+                for _ in range(size)
+            ]) / size
+            for tracked in (frozenset(range(CURRENCIES_COUNT)), user_tracked)
+        ]
+        results.append((name, len(blob), *(f'{x * 1e6:.1f}' for x in timings)))
+    return format_table(results)
@@ -0,0 +1,81 @@
+"""
+Объем кеша api котировок на пользователей: копия отрендеренного ответа
+на пользователя (cache_page), копия данных ответа на пользователя
+и только множество id отслеживаемых валют (frozenset, как его хранит
+RatesView), по которому ответ собирается из общего списка котировок.
+Считаются байты, которые бэкенд кеша записывает в redis (ключ и значение),
+без накладных расходов redis на ключ - они одинаковы для всех вариантов.
+"""
+import datetime
+import json
+import random
+
+from django.core.cache.backends.redis import RedisSerializer
+from django.http import HttpResponse
+
+from app.currency.benchmarks.helpers import format_table
+
+# количество валют в ответе сервиса котировок
+CURRENCIES_COUNT = 43
+# максимальное количество отслеживаемых пользователем валют
+MAX_TRACKED = 10
+
+
+def run(size: int = 100_000) -> str:
+    """Запускает бенчмарк для size пользователей."""
+    rnd = random.Random(0)
+    serializer = RedisSerializer()
+    today = datetime.date.today().isoformat()
+
+    rates = [
+        {
+            'id': i,
+            'date': today,
+            'charcode': f'C{i:02d}',
+            'value': round(rnd.uniform(1, 200), 4),
+        }
+        for i in range(CURRENCIES_COUNT)
+    ]
+
+    layouts = {
+        'rendered response': lambda data, ids: HttpResponse(
+            json.dumps(data), content_type='application/json'
+        ),
+        'response data': lambda data, ids: data,
+        'tracked ids': lambda data, ids: ids,
+    }
+    keys = {
+        'rendered response': (
+            'views.decorators.cache.cache_page._user_{}_.GET.'
+            '0123456789abcdef0123456789abcdef.'
+            '0123456789abcdef0123456789abcdef.en-us.Europe/Moscow'
+        ),
+        'response data': 'user_cache:{}:1700000000000000000:/api/rates/',
+        'tracked ids': 'user_currencies:{}',
+    }
+    totals = dict.fromkeys(layouts, 0)
+
+    for user_id in range(size):
+        # пользователь без отслеживаемых валют видит все котировки
+        tracked = frozenset(rnd.sample(
+            range(CURRENCIES_COUNT), rnd.randint(0, MAX_TRACKED)
+        ))
+        data = [x for x in rates if x['id'] in tracked] if tracked else rates
+
+        for name, build in layouts.items():
+            value = serializer.dumps(build(data, tracked))
+            totals[name] += len(keys[name].format(user_id)) + len(value)
+
+    shared = len(serializer.dumps(rates))
+    rows = [('layout', 'bytes/user', f'MiB/{size:,} users', 'x tracked ids')]
+    for name, total in totals.items():
+        rows.append((
+            name,
+            f'{total / size:.0f}',
+            f'{total / 2 ** 20:.1f}',
+            f'{total / totals["tracked ids"]:.1f}',
+        ))
+    return (
+        f'shared rates list: {shared} bytes (once for all users)\n'
+        + format_table(rows)
+    )
@@ -1,17 +1,45 @@
-import time
+import json
 import typing as t
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import date, datetime, timedelta
+from itertools import islice
 from logging import getLogger
 from urllib.parse import urljoin
 
 import requests
 from django.conf import settings
+from django.db import transaction
+from requests.adapters import HTTPAdapter
 
-from app.currency.models import Currency, CurrencyPrice
+from app.currency.http_cache import HttpCache
+from app.currency.loaders import PriceRow, upsert_prices
+from app.currency.models import ArchiveDay, CurrencyPrice
+from app.currency.partitions import create_price_partitions
+from app.currency.payload_archive import PayloadArchive
+from app.currency.registry import currency_registry
+from app.tools.helpers import TokenBucket
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
 logger = getLogger(__name__)
 
 
+class ArchiveDayResponse(t.NamedTuple):
+    """Результат загрузки архивных котировок за один день."""
+    date: date
+    url: str
+    data: t.Optional[t.Dict] = None
+    error: t.Optional[str] = None
+    # признак того, что данных за этот день в архиве нет и не будет
+    not_found: bool = False
+    # день уже был загружен ранее и есть в http-кеше
+    cached: bool = False
+    response: t.Optional[requests.Response] = None
+
+
 class CbrDailyApiClient:
     """Клиент API для сервиса cbr-xml-daily.ru"""
     archive_endpoint = 'archive/{year}/{month:02d}/{day:02d}/daily_json.js'
@@ -20,94 +48,331 @@ class CbrDailyApiClient:
     daily_endpoint = 'daily_json.js'
     daily_url = urljoin(settings.CBR_DAILY_API_HOST, daily_endpoint)
 
-    currencies: t.Dict[str, dict] = dict()
+    def __init__(
+        self,
+        workers: int = None,
+        rate_limit: float = None,
+        batch_size: int = None,
+        cache_dir: str = None,
+        archive_dir: str = None,
+    ) -> None:
+        """
+        workers - количество потоков для параллельной загрузки архива;
+        rate_limit - максимальное количество запросов к сервису в секунду;
+        batch_size - количество котировок, сохраняемых в БД за один запрос;
+        cache_dir - директория http-кеша (если не задана, кеш отключен);
+        archive_dir - директория архива сырых ответов сервиса
+        (если не задана, ответы не сохраняются).
+        """
+        self.workers = workers or settings.CBR_DAILY_API_WORKERS
+        self.batch_size = batch_size or settings.CBR_DAILY_API_BATCH_SIZE
+        self.rate_limiter = TokenBucket(
+            rate=rate_limit or settings.CBR_DAILY_API_RATE_LIMIT,
+        )
+
+        # пул соединений под каждый поток, чтобы не открывать их заново
+        adapter = HTTPAdapter(pool_maxsize=self.workers)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        cache_dir = cache_dir or settings.CBR_DAILY_API_CACHE_DIR
+        self.http_cache = HttpCache(cache_dir) if cache_dir else None
+
+        archive_dir = archive_dir or settings.CBR_DAILY_API_ARCHIVE_DIR
+        self.payload_archive = (
+            PayloadArchive(archive_dir) if archive_dir else None
+        )
+
+        # id валют по их символьному коду
+        self.currencies: t.Dict[str, int] = dict()
 
     def load_price_history(
-        self, days: int = 30, progress_callback: t.Callable = None
+        self,
+        days: int = 30,
+        progress_callback: t.Callable = None,
+        incremental: bool = False,
+        refetch: bool = False,
     ) -> None:
         """
         Загружает котировки для всех валют за указанное количество дней.
+        Дни архива скачиваются параллельно в несколько потоков,
+        котировки сохраняются в БД пачками по мере загрузки.
+        Вместе с каждой пачкой сохраняется отметка об обработанных днях,
+        поэтому прерванная загрузка в инкрементальном режиме продолжится
+        с того места, где остановилась.
+        В инкрементальном режиме скачиваются только дни, которых еще нет в БД.
+        В режиме refetch дни архива скачиваются заново, даже если они
+        есть в http-кеше, и перезаписываются в БД (например, чтобы
+        сохранить номиналы котировок, загруженных до их появления в БД).
         На каждом шаге вызывает callback для передачи информации о прогрессе.
         """
         today = date.today()
+        dates = [today - timedelta(days=i) for i in range(days)]
 
-        prices = []
-        for i in range(days):
-            d = today - timedelta(days=i)
-            url = self.archive_url.format(year=d.year, month=d.month, day=d.day)
-
-            data = None
-            try:
-                r = requests.get(url)
-                data = r.json()
-                error = data.get('error')
-            except Exception as e:
-                error = str(e)
+        if incremental:
+            missing = self._find_missing_dates(dates)
+            if progress_callback:
+                # пропущенные дни тоже считаем шагами загрузки
+                for d in dates:
+                    if d not in missing:
+                        progress_callback(step_date=d, url=None, error=None)
+            dates = [d for d in dates if d in missing]
 
+        if dates:
+            # партиции за годы загрузки создаем заранее, чтобы история
+            # не копилась в партиции по умолчанию
+            create_price_partitions(dates[-1].year, dates[0].year)
+
+        prices = []
+        loaded = []
+        for response in self._fetch_archive_days(dates, refetch):
             if progress_callback:
-                progress_callback(step_date=d, url=url, error=error)
+                progress_callback(
+                    step_date=response.date,
+                    url=response.url,
+                    error=response.error,
+                )
+
+            if response.error:
+                logger.error(response.error)
+                # за сегодня архив может появиться позже, перепроверим его
+                if response.not_found and response.date < today:
+                    loaded.append(response)
+                continue
 
-            if error:
-                logger.error(error)
+            if response.cached:
+                # день архива неизменен и уже был сохранен в БД
+                loaded.append(response)
                 continue
 
-            if not self.currencies:
-                self._update_currencies(data['Valute'])
+            prices += self._parse_prices(response.data)
+            loaded.append(response)
+
+            if len(prices) >= self.batch_size:
+                self._save_loaded(prices, loaded)
+                prices = []
+                loaded = []
+
+        if prices or loaded:
+            self._save_loaded(prices, loaded)
+
+    def replay_archive(
+        self,
+        date_from: date = None,
+        date_to: date = None,
+        progress_callback: t.Callable = None,
+    ) -> None:
+        """
+        Загружает котировки в БД из локального архива сырых ответов
+        без обращения к сервису.
+        На каждом документе архива вызывает callback для передачи
+        информации о прогрессе.
+        """
+        if not self.payload_archive:
+            raise ValueError('Архив ответов сервиса не настроен.')
+
+        years = [
+            x for x in self.payload_archive.years()
+            if (not date_from or x >= date_from.year)
+            and (not date_to or x <= date_to.year)
+        ]
+        if years:
+            create_price_partitions(years[0], years[-1])
+
+        prices = []
+        loaded_dates = []
+        payloads = self.payload_archive.iter_payloads(date_from, date_to)
+        for dates, data in payloads:
+            if progress_callback:
+                progress_callback(step_date=dates[0], url=None, error=None)
 
             prices += self._parse_prices(data)
-            time.sleep(0.1)  # не ддосим сервис
+            loaded_dates += dates
 
-        self._update_prices(prices)
+            if len(prices) >= self.batch_size:
+                self._save_batch(prices, loaded_dates)
+                prices = []
+                loaded_dates = []
+
+        if prices or loaded_dates:
+            self._save_batch(prices, loaded_dates)
+
+    def load_daily_prices(self) -> bool:
+        """
+        Загружает котировки для всех валют за сегодняшний день.
+        Если включен http-кеш, делает условный запрос и пропускает
+        разбор и сохранение, когда документ не изменился.
+        Возвращает признак того, что были загружены новые данные.
+        """
+        headers = dict()
+        if self.http_cache:
+            headers = self.http_cache.conditional_headers(self.daily_url)
 
-    def load_daily_prices(self) -> None:
-        """Загружает котировки для всех валют за сегодняшний день."""
         try:
-            r = requests.get(self.daily_url)
-            data = r.json()
+            r = self.session.get(self.daily_url, headers=headers)
+            if r.status_code == 304:
+                logger.info('Котировки не изменились с прошлой загрузки.')
+                return False
+            data = self._decode(r.content)
         except Exception as e:
             logger.error(e)
-            return
-
-        if not self.currencies:
-            self._update_currencies(data['Valute'])
+            return False
 
         prices = self._parse_prices(data)
         self._update_prices(prices)
 
-    def _update_currencies(self, data: t.Dict[str, t.Dict]) -> None:
-        """Заполняет таблицу доступных валют."""
-        currencies = [
-            Currency(char_code=x['CharCode'], name=x['Name'])
-            for x in data.values()
-        ]
-        Currency.objects.bulk_create(
-            objs=currencies,
-            ignore_conflicts=True,
+        if self.payload_archive:
+            day = datetime.fromisoformat(data['Date']).date()
+            self.payload_archive.add(day, data)
+            self.payload_archive.flush()
+        if self.http_cache:
+            self.http_cache.store(self.daily_url, r)
+        return True
+
+    def _find_missing_dates(self, dates: t.List[date]) -> t.Set[date]:
+        """
+        Возвращает дни, котировок за которые нет в БД
+        и которые еще не были обработаны при прошлых загрузках.
+        """
+        if not dates:
+            return set()
+
+        date_range = (min(dates), max(dates))
+        processed = set(
+            ArchiveDay.objects
+              .filter(date__range=date_range)
+              .values_list('date', flat=True)
         )
-        # обновляем данные из базы для получения id объектов
-        currencies = Currency.objects.all()
+        processed |= set(
+            CurrencyPrice.objects
+              .filter(date__range=date_range)
+              .order_by()
+              .values_list('date', flat=True)
+              .distinct()
+        )
+        return set(dates) - processed
 
-        self.currencies = {
-            x.char_code: x for x in currencies
-        }
+    def _fetch_archive_days(
+        self, dates: t.Iterable[date], refetch: bool = False
+    ) -> t.Iterator[ArchiveDayResponse]:
+        """
+        Скачивает архивные котировки за указанные дни в пуле потоков
+        и отдает результаты по мере готовности.
+        Одновременно в работе не больше 2 * workers дней: пока потребитель
+        не заберет готовые результаты, новые загрузки не запускаются.
+        """
+        dates = iter(dates)
+        window = 2 * self.workers
 
-    def _update_prices(self, prices: t.List[CurrencyPrice]) -> None:
-        """Сохраняет распарсенные котировки в БД одним запросом."""
-        CurrencyPrice.objects.bulk_create(
-            objs=prices,
-            update_conflicts=True,
-            unique_fields=['date', 'currency_id'],
-            update_fields=['value']
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {
+                executor.submit(self._fetch_archive_day, d, refetch)
+                for d in islice(dates, window)
+            }
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+                pending |= {
+                    executor.submit(self._fetch_archive_day, d, refetch)
+                    for d in islice(dates, len(done))
+                }
+
+    def _fetch_archive_day(
+        self, d: date, refetch: bool = False
+    ) -> ArchiveDayResponse:
+        """
+        Скачивает архивные котировки за указанный день.
+        Без refetch день, уже сохраненный в http-кеше, не скачивается.
+        """
+        url = self.archive_url.format(year=d.year, month=d.month, day=d.day)
+
+        if (
+            not refetch
+            and self.http_cache
+            and self.http_cache.is_immutable(url)
+        ):
+            return ArchiveDayResponse(date=d, url=url, cached=True)
+
+        try:
+            self.rate_limiter.acquire()  # не ддосим сервис
+            r = self.session.get(url)
+            data = self._decode(r.content)
+        except Exception as e:
+            return ArchiveDayResponse(date=d, url=url, error=str(e))
+
+        return ArchiveDayResponse(
+            date=d,
+            url=url,
+            data=data,
+            error=data.get('error'),
+            not_found=r.status_code == 404,
+            response=r,
         )
 
-    def _parse_prices(self, data: t.Dict) -> t.List[CurrencyPrice]:
-        """Парсит json с информацией о котировках в модель CurrencyPrice."""
+    def _save_loaded(
+        self,
+        prices: t.List[PriceRow],
+        loaded: t.List[ArchiveDayResponse],
+    ) -> None:
+        """
+        Сохраняет пачку котировок, загруженных из сервиса.
+        Только после сохранения в БД сырые ответы попадают в локальный архив,
+        а дни архива сервиса (они неизменны) - в http-кеш навсегда.
+        """
+        self._save_batch(prices, [x.date for x in loaded])
+
+        downloaded = [x for x in loaded if x.data and not x.error]
+        if self.payload_archive:
+            for x in downloaded:
+                self.payload_archive.add(x.date, x.data)
+            self.payload_archive.flush()
+        if self.http_cache:
+            for x in downloaded:
+                self.http_cache.store(x.url, x.response, immutable=True)
+
+    def _save_batch(
+        self, prices: t.List[PriceRow], loaded_dates: t.List[date]
+    ) -> None:
+        """
+        Сохраняет пачку котировок и отмечает дни, за которые они
+        были загружены, как обработанные.
+        """
+        with transaction.atomic():
+            self._update_prices(prices)
+            ArchiveDay.objects.bulk_create(
+                objs=[ArchiveDay(date=d) for d in loaded_dates],
+                ignore_conflicts=True,
+            )
+
+    def _update_prices(self, prices: t.List[PriceRow]) -> None:
+        """Сохраняет распарсенные котировки в БД одним запросом."""
+        if prices:
+            upsert_prices(prices)
+
+    def _parse_prices(self, data: t.Dict) -> t.List[PriceRow]:
+        """Парсит json с информацией о котировках в строки таблицы цен."""
         date = datetime.fromisoformat(data['Date']).date()
+
+        currencies = self.currencies
+        valute = data['Valute'].values()
+        if any(x['CharCode'] not in currencies for x in valute):
+            # в ответе есть новые валюты, добавляем их в реестр
+            currencies = self.currencies = currency_registry.ensure(valute)
+
+        # цена указывается за Nominal единиц валюты, номинал
+        # может меняться со временем, поэтому хранится с каждой ценой
         return [
-            CurrencyPrice(
-                date=date,
-                currency=self.currencies[x['CharCode']],
-                value=x['Value']
-            )
-            for x in data['Valute'].values()
+            (date, currencies[x['CharCode']], x['Value'],
+             int(x.get('Nominal') or 1))
+            for x in valute
         ]
+
+    @staticmethod
+    def _decode(content: bytes) -> t.Dict:
+        """Декодирует json, при наличии используя быстрый orjson."""
+        if orjson:
+            return orjson.loads(content)
+        return json.loads(content)
@@ -0,0 +1,158 @@
+import threading
+import typing as t
+from array import array
+from datetime import date
+
+from django.db.models import Max
+
+from app.currency.api import const
+from app.currency.helpers import api_cache_generation
+from app.currency.models import CurrencyPrice, LatestCurrencyPrice
+from app.currency.registry import currency_registry
+from app.tools.helpers import cache_get_or_fill
+
+# валюта, к которой ЦБ указывает цены всех валют
+BASE_CURRENCY = 'RUB'
+
+
+class RateTable:
+    """
+    Курсы всех валют к рублю за дату: цена одной единицы валюты в рублях
+    (с учетом номинала). Кросс-курс любой пары - отношение двух элементов
+    вектора, поэтому матрица N x N не хранится, а строится по запросу.
+    """
+    def __init__(
+        self, day: date, char_codes: t.List[str], rates: array
+    ) -> None:
+        self.date = day
+        self.char_codes = char_codes
+        self.rates = rates
+        self.index = {code: i for i, code in enumerate(char_codes)}
+
+    def rate(self, source: str, target: str) -> float:
+        """Стоимость одной единицы валюты source в единицах валюты target."""
+        rates, index = self.rates, self.index
+        return rates[index[source]] / rates[index[target]]
+
+    def matrix(self, char_codes: t.List[str]) -> t.List[t.List[float]]:
+        """
+        Матрица кросс-курсов валют: элемент [i][j] - стоимость
+        одной единицы i-й валюты в единицах j-й.
+        """
+        rates = [self.rates[self.index[x]] for x in char_codes]
+        return [[x / y for y in rates] for x in rates]
+
+    def dumps(self) -> t.Tuple[str, str, bytes]:
+        """
+        Компактное представление для общего кеша: дата, коды валют
+        одной строкой и курсы - массивом double.
+        """
+        return (
+            self.date.isoformat(),
+            ','.join(self.char_codes),
+            self.rates.tobytes(),
+        )
+
+    @classmethod
+    def loads(cls, value: t.Tuple[str, str, bytes]) -> 'RateTable':
+        """Восстанавливает таблицу из компактного представления."""
+        day, char_codes, rates = value
+        return cls(
+            day=date.fromisoformat(day),
+            char_codes=char_codes.split(','),
+            rates=array('d', rates),
+        )
+
+
+def build_rate_table(day: t.Optional[date] = None) -> t.Optional[RateTable]:
+    """
+    Строит таблицу курсов по котировкам за дату. Если за дату котировок
+    нет (выходные и праздники), берется последняя дата до нее.
+    Без даты таблица строится по последним загруженным котировкам.
+    Цены делятся на номинал, действовавший на дату котировки.
+    Котировки с неизвестным номиналом (загруженные до того, как номинал
+    стал сохраняться) в таблицу не попадают: курс по ним может быть
+    неверен в десятки раз. Их исправляет повторная загрузка истории
+    с параметром --refetch.
+    Возвращает None, если котировок нет.
+    """
+    if day is None:
+        day = LatestCurrencyPrice.objects.aggregate(x=Max('date'))['x']
+    else:
+        day = CurrencyPrice.objects.filter(
+            date__lte=day
+        ).aggregate(x=Max('date'))['x']
+
+    if day is None:
+        return None
+
+    char_codes = currency_registry.get_char_codes()
+    prices = CurrencyPrice.objects.filter(
+        date=day, nominal__isnull=False
+    ).values_list(
+        'currency_id', 'value', 'nominal'
+    )
+
+    codes, rates = [BASE_CURRENCY], array('d', [1.0])
+    for currency_id, value, nominal in prices:
+        code = char_codes[currency_id]
+        if code == BASE_CURRENCY:
+            continue
+        codes.append(code)
+        rates.append(float(value) / nominal)
+    return RateTable(day=day, char_codes=codes, rates=rates)
+
+
+class RateTableStore:
+    """
+    Таблицы курсов, общие для всех процессов: таблица за дату строится
+    один раз после загрузки котировок (в единственном экземпляре)
+    и хранится в общем кеше в компактном виде, а в памяти процесса -
+    готовой к расчетам. Поэтому конвертация не обращается к БД,
+    а из кеша читается только поколение кеша api.
+    Таблицы сбрасываются вместе с остальными кешами api.
+    """
+    # максимальное количество таблиц в памяти процесса
+    max_tables = 64
+
+    def __init__(self) -> None:
+        self._tables: t.Dict[t.Optional[date], t.Optional[RateTable]] = {}
+        self._generation: t.Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get(self, day: t.Optional[date] = None) -> t.Optional[RateTable]:
+        """
+        Возвращает таблицу курсов за дату (по умолчанию - по последним
+        котировкам) или None, если котировок нет.
+        """
+        generation = api_cache_generation.get()
+        with self._lock:
+            if generation != self._generation:
+                self._tables = {}
+                self._generation = generation
+            if day in self._tables:
+                return self._tables[day]
+
+        # отсутствие котировок кешируется пустым значением
+        value = cache_get_or_fill(
+            key=(
+                f'{const.rate_table_cache_key}:{generation}:'
+                f'{day.isoformat() if day else "latest"}'
+            ),
+            fill=lambda: (build_rate_table(day) or EMPTY_TABLE).dumps(),
+            timeout=const.rates_cache_timeout,
+        )
+        table = RateTable.loads(value) if value[1] else None
+
+        with self._lock:
+            if generation == self._generation:
+                if len(self._tables) >= self.max_tables:
+                    self._tables = {}
+                self._tables[day] = table
+        return table
+
+
+# пустая таблица для кеширования отсутствия котировок
+EMPTY_TABLE = RateTable(day=date.min, char_codes=[], rates=array('d'))
+
+rate_tables = RateTableStore()
@@ -0,0 +1,109 @@
+import typing as t
+from bisect import bisect_right
+from datetime import date
+
+
+def lttb(
+    xs: t.Sequence[float],
+    ys: t.Sequence[float],
+    max_points: int,
+    keep: t.Iterable[int] = (),
+) -> t.List[int]:
+    """
+    Прореживает ряд алгоритмом Largest-Triangle-Three-Buckets:
+    первая и последняя точки сохраняются, остальные делятся на
+    max_points - 2 корзины, и из каждой берется точка, образующая
+    наибольший треугольник с уже выбранной точкой предыдущей корзины
+    и средней точкой следующей. Форма графика при этом сохраняется.
+    Точки с индексами из keep (например, экстремумы) выбираются
+    в своих корзинах вместо точки с наибольшим треугольником,
+    при этом точек в результате по-прежнему не больше max_points
+    (если max_points хватает на первую, последнюю и обязательные точки).
+    Возвращает отсортированные индексы выбранных точек.
+    """
+    n = len(ys)
+    if max_points >= n or max_points < 3:
+        return list(range(n))
+
+    keep = sorted({i for i in keep if 0 < i < n - 1})
+    # если несколько обязательных точек попали в одну корзину,
+    # корзин становится меньше, чтобы точек было не больше max_points
+    for buckets in range(max_points - 2, 0, -1):
+        bounds = _bucket_bounds(n, buckets)
+        required = dict()
+        for i in keep:
+            required.setdefault(bisect_right(bounds, i) - 1, []).append(i)
+        if buckets + len(keep) - len(required) + 2 <= max_points:
+            break
+
+    pick = _bucket_picker(xs, ys, bounds)
+
+    selected = [0]
+    for bucket in range(buckets):
+        if bucket in required:
+            selected += required[bucket]
+        else:
+            selected.append(pick(bucket, selected[-1]))
+    selected.append(n - 1)
+    return selected
+
+
+def downsample_prices(
+    series: t.Sequence[t.Tuple[date, t.Any]],
+    max_points: int,
+) -> t.List[t.Tuple[date, t.Any]]:
+    """
+    Прореживает ряд цен (дата, цена), упорядоченный по дате,
+    до max_points точек алгоритмом LTTB по оси дат, сохраняя
+    максимальную и минимальную цену.
+    """
+    if len(series) <= max_points:
+        return list(series)
+
+    values = [x for _, x in series]
+    selected = lttb(
+        xs=[d.toordinal() for d, _ in series],
+        ys=[float(x) for x in values],
+        max_points=max_points,
+        keep=[values.index(max(values)), values.index(min(values))],
+    )
+    return [series[i] for i in selected]
+
+
+def _bucket_bounds(n: int, buckets: int) -> t.List[int]:
+    """
+    Границы корзин для точек ряда между первой и последней:
+    корзина i - точки [bounds[i], bounds[i + 1]). Считаются целочисленно,
+    чтобы последняя граница всегда была n - 1.
+    """
+    return [i * (n - 2) // buckets + 1 for i in range(buckets + 1)]
+
+
+def _bucket_picker(
+    xs: t.Sequence[float],
+    ys: t.Sequence[float],
+    bounds: t.List[int],
+) -> t.Callable[[int, int], int]:
+    """
+    Выбор точки корзины: точка, образующая наибольший треугольник
+    с точкой a и средней точкой следующей корзины.
+    """
+    n = len(ys)
+
+    def pick(bucket: int, a: int) -> int:
+        # средняя точка следующей корзины (для последней - последняя точка)
+        start = bounds[bucket + 1]
+        end = bounds[bucket + 2] if bucket + 2 < len(bounds) else n
+        avg_x = sum(xs[start:end]) / (end - start)
+        avg_y = sum(ys[start:end]) / (end - start)
+
+        xa, ya = xs[a], ys[a]
+        return max(
+            range(bounds[bucket], bounds[bucket + 1]),
+            key=lambda i: abs(
+                (xa - avg_x) * (ys[i] - ya) - (xa - xs[i]) * (avg_y - ya)
+            ),
+        )
+
+    return pick
+
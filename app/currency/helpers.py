@@ -1,11 +1,110 @@
+import statistics
+import typing as t
+from datetime import date
+from decimal import Decimal
+
 from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (Avg, Count, Max, Min, Q, QuerySet, StdDev,
+                              Subquery)
 
 from app.currency.api import const
+from app.currency.models import UserCurrency
+from app.tools.helpers import CacheGeneration, cache_get_or_fill
+
+# поколение кешей представлений для api
+api_cache_generation = CacheGeneration(const.api_cache_generation_key)
 
 
 def clear_api_cache() -> None:
-    """Очищает кеши представлений для api."""
+    """
+    Очищает кеши представлений для api: начинает новое поколение кеша,
+    записи прежнего поколения истекают сами.
+    """
+    api_cache_generation.bump()
+
+
+def get_user_currency_ids(user_id: int) -> t.FrozenSet[int]:
+    """
+    Возвращает множество id отслеживаемых пользователем валют.
+    Множество хранится в кеше, пока валюты пользователя не изменятся.
+    """
+    return cache_get_or_fill(
+        key=f'{const.user_currencies_cache_key}:{user_id}',
+        fill=lambda: frozenset(
+            UserCurrency.objects
+              .filter(user_id=user_id)
+              .order_by()
+              .values_list('currency_id', flat=True)
+        ),
+        timeout=const.user_currencies_cache_timeout,
+    )
+
+
+def clear_user_currencies_cache(user_id: int) -> None:
+    """Сбрасывает кеш отслеживаемых пользователем валют."""
+    key = f'{const.user_currencies_cache_key}:{user_id}'
+    cache.delete(key)
+    # до завершения транзакции кеш мог заполниться прежними данными
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def get_prices_summary(queryset: QuerySet) -> t.Dict[str, t.Any]:
+    """
+    Вычисляет сводку по выборке цен одним агрегирующим запросом:
+    количество котировок, первую и последнюю дату, минимум, максимум,
+    среднее, стандартное отклонение, первую и последнюю цену
+    и изменение цены за период в процентах.
+    Первая и последняя цена берутся условной агрегацией по крайним
+    датам, которые находят подзапросы по индексу (валюта, дата),
+    поэтому выборка не сортируется и не нужны оконные функции.
+    """
+    queryset = queryset.order_by()
+    dates = queryset.values('date')
+    summary = queryset.aggregate(
+        count=Count('id'),
+        first_date=Min('date'),
+        last_date=Max('date'),
+        min=Min('value'),
+        max=Max('value'),
+        average=Avg('value'),
+        stddev=StdDev('value'),
+        first=Max(
+            'value', filter=Q(date=Subquery(dates.order_by('date')[:1]))
+        ),
+        last=Max(
+            'value', filter=Q(date=Subquery(dates.order_by('-date')[:1]))
+        ),
+    )
+
+    first, last = summary['first'], summary['last']
+    summary['change_percent'] = (
+        round((last - first) / first * 100, 2) if first else None
+    )
+    return summary
+
 
-    keys = cache.keys(f'*{const.rates_cache_key}*')
-    keys += cache.keys('*views.decorators.cache*')
-    cache.delete_many(keys=keys)
+def get_series_summary(
+    series: t.Sequence[t.Tuple[date, Decimal]],
+) -> t.Dict[str, t.Any]:
+    """
+    Вычисляет сводку по уже загруженному непустому ряду цен
+    (дата, цена), упорядоченному по дате, с теми же полями,
+    что и get_prices_summary.
+    """
+    values = [x for _, x in series]
+    first, last = values[0], values[-1]
+    return {
+        'count': len(values),
+        'first_date': series[0][0],
+        'last_date': series[-1][0],
+        'min': min(values),
+        'max': max(values),
+        'average': sum(values) / len(values),
+        'stddev': float(statistics.pstdev(values)),
+        'first': first,
+        'last': last,
+        'change_percent': (
+            round((last - first) / first * 100, 2) if first else None
+        ),
+    }
@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+import tempfile
+import typing as t
+from pathlib import Path
+
+import requests
+
+
+class HttpCache:
+    """
+    Дисковый кеш http-ответов для условных запросов.
+    Хранит не тело ответа, а только его валидаторы (ETag и Last-Modified),
+    по которым сервис может ответить 304 Not Modified.
+    Неизменяемые документы (дни архива) помечаются как постоянные:
+    для них запрос к сервису не нужен вовсе.
+    """
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get(self, url: str) -> t.Optional[t.Dict]:
+        """Возвращает сохраненную запись для url."""
+        try:
+            with open(self._path(url)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_immutable(self, url: str) -> bool:
+        """Проверяет, что документ по url сохранен как неизменяемый."""
+        entry = self.get(url)
+        return bool(entry and entry.get('immutable'))
+
+    def conditional_headers(self, url: str) -> t.Dict[str, str]:
+        """Заголовки для условного запроса документа по url."""
+        entry = self.get(url) or dict()
+
+        headers = dict()
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(
+        self, url: str, response: requests.Response, immutable: bool = False
+    ) -> None:
+        """Сохраняет валидаторы ответа для url."""
+        entry = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'immutable': immutable,
+        }
+        # пишем через временный файл, чтобы параллельные читатели
+        # никогда не увидели недописанную запись
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(url))
+
+    def _path(self, url: str) -> Path:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f'{key}.json'
@@ -0,0 +1,170 @@
+import io
+import typing as t
+from datetime import date
+
+from django.db import connection, transaction
+
+from app.currency.models import Currency, CurrencyPrice, LatestCurrencyPrice
+from app.currency.rollups import refresh_price_rollups
+
+# котировка в виде строки таблицы: (дата, id валюты, значение, номинал)
+PriceRow = t.Tuple[date, int, t.Any, int]
+
+
+class RowsReader(io.TextIOBase):
+    """
+    Файлоподобный объект поверх итератора строк таблицы в формате COPY.
+    Позволяет передавать строки в COPY потоком, не собирая весь
+    текст в памяти.
+    """
+    def __init__(self, rows: t.Iterable[PriceRow]) -> None:
+        self._lines = (
+            f'{d.isoformat()}\t{currency_id}\t{value}\t{nominal}\n'
+            for d, currency_id, value, nominal in rows
+        )
+        self._buffer = ''
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readline(self, size: int = -1) -> str:
+        return self.read(size)
+
+
+def upsert_prices(rows: t.Iterable[PriceRow]) -> None:
+    """
+    Сохраняет котировки в БД, обновляя уже существующие.
+    Вместе с историей цен обновляется таблица последних котировок,
+    а номинал валюты - только по котировкам, ставшим последними
+    (загрузка старой истории не меняет текущий номинал).
+    Строки загружаются через COPY во временную таблицу и затем одним
+    запросом сливаются в таблицу котировок (схема таблицы котировок -
+    секции, BRIN-индекс - рассчитана только на postgresql).
+    Затем пересчитываются свертки истории цен за затронутые периоды.
+    """
+    loaded = set()
+
+    def track(rows: t.Iterable[PriceRow]) -> t.Iterator[PriceRow]:
+        for row in rows:
+            loaded.add((row[1], row[0]))
+            yield row
+
+    with transaction.atomic():
+        _copy_upsert_prices(track(rows))
+        refresh_price_rollups(loaded)
+
+
+def _copy_upsert_prices(rows: t.Iterable[PriceRow]) -> None:
+    table = CurrencyPrice._meta.db_table
+    latest_table = LatestCurrencyPrice._meta.db_table
+    currency_table = Currency._meta.db_table
+    staging = f'{table}_staging'
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMP TABLE {staging} '
+            f'(date date, currency_id bigint, value numeric(10, 4), '
+            f'nominal integer) '
+            f'ON COMMIT DROP'
+        )
+        cursor.copy_expert(
+            f'COPY {staging} (date, currency_id, value, nominal) FROM STDIN',
+            RowsReader(rows),
+        )
+        # в пачке могут встречаться одинаковые документы
+        # (архив за выходные дни), а ON CONFLICT не может обновить
+        # одну строку дважды - поэтому убираем дубли
+        cursor.execute(
+            f'INSERT INTO {table} (date, currency_id, value, nominal) '
+            f'SELECT DISTINCT ON (date, currency_id) '
+            f'date, currency_id, value, nominal FROM {staging} '
+            f'ORDER BY date, currency_id '
+            f'ON CONFLICT (date, currency_id) '
+            f'DO UPDATE SET value = EXCLUDED.value, nominal = EXCLUDED.nominal'
+        )
+        # последние котировки обновляем, только если пришли более свежие
+        cursor.execute(
+            f'INSERT INTO {latest_table} AS latest (currency_id, date, value) '
+            f'SELECT DISTINCT ON (currency_id) currency_id, date, value '
+            f'FROM {staging} '
+            f'ORDER BY currency_id, date DESC '
+            f'ON CONFLICT (currency_id) '
+            f'DO UPDATE SET date = EXCLUDED.date, value = EXCLUDED.value '
+            f'WHERE latest.date <= EXCLUDED.date'
+        )
+        # номинал валюты берем только из котировок, ставших последними
+        cursor.execute(
+            f'UPDATE {currency_table} AS currency '
+            f'SET nominal = staging.nominal '
+            f'FROM {staging} AS staging '
+            f'JOIN {latest_table} AS latest '
+            f'ON latest.currency_id = staging.currency_id '
+            f'AND latest.date = staging.date '
+            f'WHERE currency.id = staging.currency_id '
+            f'AND currency.nominal <> staging.nominal'
+        )
+        # таблица может понадобиться снова до конца транзакции
+        cursor.execute(f'DROP TABLE {staging}')
+
+
+def update_latest_price(
+    currency_id: int, d: date, value: t.Any, nominal: t.Optional[int]
+) -> None:
+    """
+    Обновляет последнюю котировку и номинал валюты,
+    если переданная котировка не старее.
+    """
+    updated = LatestCurrencyPrice.objects.filter(
+        currency_id=currency_id, date__lte=d
+    ).update(date=d, value=value)
+
+    if not updated:
+        _, updated = LatestCurrencyPrice.objects.get_or_create(
+            currency_id=currency_id,
+            defaults={'date': d, 'value': value},
+        )
+
+    if updated and nominal is not None:
+        Currency.objects.filter(id=currency_id).exclude(
+            nominal=nominal
+        ).update(nominal=nominal)
+
+
+def refresh_latest_prices(currency_ids: t.Iterable[int]) -> None:
+    """
+    Пересчитывает последние котировки валют по истории цен
+    двумя запросами для всех валют сразу. Валюты, у которых
+    не осталось котировок, из таблицы последних котировок удаляются.
+    """
+    currency_ids = list(currency_ids)
+    if not currency_ids:
+        return
+
+    table = CurrencyPrice._meta.db_table
+    latest_table = LatestCurrencyPrice._meta.db_table
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {latest_table} WHERE currency_id = ANY(%s)',
+            [currency_ids],
+        )
+        cursor.execute(
+            f'INSERT INTO {latest_table} (currency_id, date, value) '
+            f'SELECT DISTINCT ON (currency_id) currency_id, date, value '
+            f'FROM {table} '
+            f'WHERE currency_id = ANY(%s) '
+            f'ORDER BY currency_id, date DESC',
+            [currency_ids],
+        )
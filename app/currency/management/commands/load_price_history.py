@@ -7,6 +7,7 @@ from tqdm import tqdm
 from app.currency.cbr_client import CbrDailyApiClient
 from app.currency.helpers import clear_api_cache
 from app.currency.tasks import send_threshold_emails
+from app.currency.warmup import warm_api_cache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,6 +27,30 @@ class Command(BaseCommand):
             help='Принудительно отправить имейлы, даже если они '
                  'сегодня уже отправлялись.'
         )
+        parser.add_argument(
+            '-w', '--workers', nargs='?', type=int, default=None,
+            help='Количество потоков для параллельной загрузки.'
+        )
+        parser.add_argument(
+            '-r', '--rate_limit', nargs='?', type=float, default=None,
+            help='Максимальное количество запросов к сервису в секунду.'
+        )
+        parser.add_argument(
+            '-b', '--batch_size', nargs='?', type=int, default=None,
+            help='Количество котировок, сохраняемых в БД за один запрос.'
+        )
+        parser.add_argument(
+            '-i', '--incremental', nargs='?', type=bool,
+            default=False, const=True,
+            help='Загрузить только те дни, которых еще нет в БД. '
+                 'Позволяет продолжить прерванную загрузку.'
+        )
+        parser.add_argument(
+            '--refetch', nargs='?', type=bool,
+            default=False, const=True,
+            help='Скачать дни архива заново, даже если они есть '
+                 'в http-кеше, и перезаписать их в БД.'
+        )
 
     def handle(self, *args, **options) -> None:
         days = options['days']
@@ -47,21 +72,30 @@ class Command(BaseCommand):
                 errors += 1
 
         with tqdm(total=days) as pbar:
-            client = CbrDailyApiClient()
+            client = CbrDailyApiClient(
+                workers=options['workers'],
+                rate_limit=options['rate_limit'],
+                batch_size=options['batch_size'],
+            )
             client.load_price_history(
                 days=days,
                 progress_callback=progress_callback,
+                incremental=options['incremental'],
+                refetch=options['refetch'],
             )
 
         # отправляем имейлы
         send_threshold_emails.delay(force=options['force_emails'])
         # очищаем кеши представлений для api
         clear_api_cache()
+        # прогреваем кеши до прихода пользователей
+        warmup_time = warm_api_cache()
 
         logger.info(
             f'\nДанные загружены.\n'
             f'Обработано дней: {days}\n'
             f'Количество ошибок: {errors}\n'
+            f'Кеши api прогреты за {warmup_time:.3f} с\n'
         )
 
 
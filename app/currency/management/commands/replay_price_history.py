@@ -0,0 +1,68 @@
+import datetime
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from tqdm import tqdm
+
+from app.currency.cbr_client import CbrDailyApiClient
+from app.currency.helpers import clear_api_cache
+from app.currency.warmup import warm_api_cache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает историю цен из локального архива ответов сервиса '
+        'без обращения к сети.'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--date_from', nargs='?', type=datetime.date.fromisoformat,
+            default=None,
+            help='Начальная дата (YYYY-MM-DD).'
+        )
+        parser.add_argument(
+            '--date_to', nargs='?', type=datetime.date.fromisoformat,
+            default=None,
+            help='Конечная дата (YYYY-MM-DD).'
+        )
+        parser.add_argument(
+            '-b', '--batch_size', nargs='?', type=int, default=None,
+            help='Количество котировок, сохраняемых в БД за один запрос.'
+        )
+
+    def handle(self, *args, **options) -> None:
+        client = CbrDailyApiClient(batch_size=options['batch_size'])
+        if not client.payload_archive:
+            raise CommandError(
+                'Архив не настроен: задайте CBR_DAILY_API_ARCHIVE_DIR.'
+            )
+
+        documents = 0
+
+        def progress_callback(step_date: datetime.date, **kwargs) -> None:
+            """Callback для получения информации о прогрессе загрузки."""
+            nonlocal documents
+            documents += 1
+            pbar.update(1)
+
+        with tqdm() as pbar:
+            client.replay_archive(
+                date_from=options['date_from'],
+                date_to=options['date_to'],
+                progress_callback=progress_callback,
+            )
+
+        # очищаем кеши представлений для api
+        clear_api_cache()
+        # прогреваем кеши до прихода пользователей
+        warmup_time = warm_api_cache()
+
+        logger.info(
+            f'\nДанные загружены из архива.\n'
+            f'Обработано документов: {documents}\n'
+            f'Кеши api прогреты за {warmup_time:.3f} с\n'
+        )
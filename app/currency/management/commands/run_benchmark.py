@@ -0,0 +1,37 @@
+import importlib
+import pkgutil
+
+from django.core.management.base import BaseCommand
+
+from app.currency import benchmarks
+
+# модули бенчмарков, кроме вспомогательных
+BENCHMARKS = sorted(
+    x.name for x in pkgutil.iter_modules(benchmarks.__path__)
+    if x.name != 'helpers'
+)
+
+
+class Command(BaseCommand):
+    help = 'Запускает бенчмарк производительности и печатает результаты.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            'name', choices=BENCHMARKS,
+            help='Название бенчмарка.'
+        )
+        parser.add_argument(
+            '-s', '--size', nargs='?', type=int, default=None,
+            help='Размер данных для бенчмарка (смысл зависит от бенчмарка).'
+        )
+
+    def handle(self, *args, **options) -> None:
+        module = importlib.import_module(
+            f'{benchmarks.__name__}.{options["name"]}'
+        )
+        self.stdout.write(module.__doc__.strip() + '\n')
+
+        kwargs = dict()
+        if options['size']:
+            kwargs['size'] = options['size']
+        self.stdout.write(module.run(**kwargs))
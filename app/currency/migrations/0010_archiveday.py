@@ -0,0 +1,24 @@
+# Generated by Django 4.2.4 on 2026-10-18 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency', '0009_alter_currencyprice_currency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ('-date',),
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.4 on 2026-10-18 07:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency', '0010_archiveday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestCurrencyPrice',
+            fields=[
+                ('currency', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest_price', serialize=False, to='currency.currency')),
+                ('date', models.DateField()),
+                ('value', models.DecimalField(decimal_places=4, max_digits=10)),
+            ],
+            options={
+                'ordering': ('currency',),
+            },
+        ),
+        # заполняем таблицу последними котировками из истории цен
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO currency_latestcurrencyprice (currency_id, date, value)
+                SELECT DISTINCT ON (currency_id) currency_id, date, value
+                FROM currency_currencyprice
+                ORDER BY currency_id, date DESC
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
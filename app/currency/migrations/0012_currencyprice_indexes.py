@@ -0,0 +1,22 @@
+# Generated by Django 4.2.4 on 2026-10-18 07:17
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency', '0011_latestcurrencyprice'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='currencyprice',
+            index=models.Index(fields=['currency', '-date'], include=('value',), name='currencyprice_currency_date'),
+        ),
+        migrations.AddIndex(
+            model_name='currencyprice',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['date'], name='currencyprice_date_brin'),
+        ),
+    ]
@@ -0,0 +1,113 @@
+import datetime
+
+from django.db import migrations
+
+TABLE = 'currency_currencyprice'
+COLUMNS = 'id, date, value, currency_id'
+
+# индексы и ограничения таблицы с именами, которые им дал django
+UNIQUE = 'currency_currencyprice_date_currency_id_166d1f5e_uniq'
+CURRENCY_INDEX = 'currency_currencyprice_currency_id_70165081'
+CURRENCY_FK = 'currency_currencypri_currency_id_70165081_fk_currency_'
+
+
+def _rebuild_table(schema_editor, partitioned: bool) -> None:
+    """
+    Пересоздает таблицу котировок: секционированную по годам
+    или обычную. Данные копируются в новую таблицу, старая удаляется.
+    """
+    new = f'{TABLE}_new'
+    pk = '(id, date)' if partitioned else '(id)'
+    partition_by = 'PARTITION BY RANGE (date)' if partitioned else ''
+
+    # внешние ключи django отложены, а таблицу с отложенными
+    # проверками нельзя удалить в той же транзакции
+    schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+    with schema_editor.connection.cursor() as cursor:
+        schema_editor.execute(
+            f'CREATE TABLE {new} ('
+            f'  id bigint GENERATED BY DEFAULT AS IDENTITY,'
+            f'  date date NOT NULL,'
+            f'  value numeric(10, 4) NOT NULL,'
+            f'  currency_id bigint NOT NULL,'
+            f'  CONSTRAINT {TABLE}_pkey_new PRIMARY KEY {pk}'
+            f') {partition_by}'
+        )
+
+        if partitioned:
+            cursor.execute(f'SELECT min(date) FROM {TABLE}')
+            first = cursor.fetchone()[0]
+            this_year = datetime.date.today().year
+            year_from = first.year if first else this_year
+
+            for year in range(year_from, this_year + 2):
+                schema_editor.execute(
+                    f'CREATE TABLE {TABLE}_y{year} PARTITION OF {new} '
+                    f'FOR VALUES FROM (%s) TO (%s)',
+                    [datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)],
+                )
+            schema_editor.execute(
+                f'CREATE TABLE {TABLE}_default PARTITION OF {new} DEFAULT'
+            )
+
+        schema_editor.execute(
+            f'INSERT INTO {new} ({COLUMNS}) '
+            f'SELECT {COLUMNS} FROM {TABLE}'
+        )
+        schema_editor.execute(f'DROP TABLE {TABLE}')
+
+        schema_editor.execute(f'ALTER TABLE {new} RENAME TO {TABLE}')
+        schema_editor.execute(
+            f'ALTER TABLE {TABLE} '
+            f'RENAME CONSTRAINT {TABLE}_pkey_new TO {TABLE}_pkey'
+        )
+        schema_editor.execute(
+            f'ALTER SEQUENCE {new}_id_seq RENAME TO {TABLE}_id_seq'
+        )
+        schema_editor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+            f"coalesce(max(id), 0) + 1, false) FROM {TABLE}"
+        )
+
+    # индексы создаем после копирования данных - так быстрее
+    schema_editor.execute(
+        f'ALTER TABLE {TABLE} ADD CONSTRAINT {UNIQUE} '
+        f'UNIQUE (date, currency_id)'
+    )
+    schema_editor.execute(
+        f'CREATE INDEX {CURRENCY_INDEX} ON {TABLE} (currency_id)'
+    )
+    schema_editor.execute(
+        f'CREATE INDEX currencyprice_currency_date ON {TABLE} '
+        f'(currency_id, date DESC) INCLUDE (value)'
+    )
+    schema_editor.execute(
+        f'CREATE INDEX currencyprice_date_brin ON {TABLE} USING brin (date)'
+    )
+    schema_editor.execute(
+        f'ALTER TABLE {TABLE} ADD CONSTRAINT {CURRENCY_FK} '
+        f'FOREIGN KEY (currency_id) REFERENCES currency_currency (id) '
+        f'DEFERRABLE INITIALLY DEFERRED'
+    )
+
+
+def partition_table(apps, schema_editor) -> None:
+    _rebuild_table(schema_editor, partitioned=True)
+
+
+def unpartition_table(apps, schema_editor) -> None:
+    _rebuild_table(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency', '0012_currencyprice_indexes'),
+    ]
+
+    operations = [
+        # секционирование таблицы котировок по годам;
+        # django о нем не знает, структура модели не меняется
+        migrations.RunPython(partition_table, unpartition_table),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.4 on 2026-10-18 07:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency', '0013_partition_currencyprice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurrencyPriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.CharField(choices=[('week', 'Неделя'), ('month', 'Месяц')], max_length=5)),
+                ('date', models.DateField()),
+                ('open', models.DecimalField(decimal_places=4, max_digits=10)),
+                ('high', models.DecimalField(decimal_places=4, max_digits=10)),
+                ('low', models.DecimalField(decimal_places=4, max_digits=10)),
+                ('close', models.DecimalField(decimal_places=4, max_digits=10)),
+                ('average', models.DecimalField(decimal_places=4, max_digits=10)),
+                ('count', models.PositiveSmallIntegerField()),
+                ('currency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='currency.currency')),
+            ],
+            options={
+                'ordering': ('-date', 'currency'),
+                'unique_together': {('currency', 'interval', 'date')},
+            },
+        ),
+        # заполняем свертки по уже загруженной истории цен
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO currency_currencypricerollup
+                    (currency_id, "interval", date,
+                     open, high, low, close, average, count)
+                SELECT
+                    currency_id,
+                    i.name,
+                    date_trunc(i.name, date)::date,
+                    (array_agg(value ORDER BY date))[1],
+                    max(value),
+                    min(value),
+                    (array_agg(value ORDER BY date DESC))[1],
+                    round(avg(value), 4),
+                    count(*)
+                FROM currency_currencyprice
+                CROSS JOIN (VALUES ('week'), ('month')) AS i (name)
+                GROUP BY currency_id, i.name, date_trunc(i.name, date)
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
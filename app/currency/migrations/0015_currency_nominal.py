@@ -0,0 +1,31 @@
+# Generated by Django 4.2.4 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currency', '0014_currencypricerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='currency',
+            name='nominal',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        # номиналы уже загруженной истории неизвестны: столбец добавляется
+        # без значения по умолчанию, и старые котировки получают NULL,
+        # чтобы курсы по ним не считались с неверным номиналом
+        migrations.AddField(
+            model_name='currencyprice',
+            name='nominal',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='currencyprice',
+            name='nominal',
+            field=models.PositiveIntegerField(default=1, null=True),
+        ),
+    ]
@@ -1,6 +1,9 @@
 import datetime
+import typing as t
 
-from django.db import models
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import models, transaction
+from django.dispatch import Signal
 from solo.models import SingletonModel
 
 from app.users.models import User
@@ -9,6 +12,9 @@ from app.users.models import User
 class Currency(models.Model):
     char_code = models.CharField(max_length=3, unique=True)
     name = models.CharField(max_length=50, unique=True)
+    # количество единиц валюты, за которое указывается цена в рублях,
+    # по последней котировке
+    nominal = models.PositiveIntegerField(default=1)
 
     def __str__(self):
         return f'{self.char_code}: {self.name}'
@@ -17,6 +23,30 @@ class Currency(models.Model):
         ordering = ('char_code',)
 
 
+# удаление котировок; deleted - множество пар (id валюты, дата)
+prices_deleted = Signal()
+
+
+class CurrencyPriceQuerySet(models.QuerySet):
+
+    def delete(self) -> t.Tuple[int, t.Dict[str, int]]:
+        """
+        Удаляет котировки одним запросом и сообщает о них сигналом
+        prices_deleted, чтобы зависящие от них данные пересчитывались
+        разом для всех затронутых валют и дат. Сигналы post_delete
+        для котировок не используются: они отключают быстрое удаление
+        и требуют запросов на каждую строку.
+        """
+        with transaction.atomic():
+            deleted = set(
+                self.order_by().values_list('currency_id', 'date').distinct()
+            )
+            result = super().delete()
+            if deleted:
+                prices_deleted.send(sender=CurrencyPrice, deleted=deleted)
+        return result
+
+
 class CurrencyPrice(models.Model):
     date = models.DateField()
     currency = models.ForeignKey(
@@ -25,10 +55,62 @@ class CurrencyPrice(models.Model):
         related_name='prices',
     )
     value = models.DecimalField(decimal_places=4, max_digits=10)
+    # количество единиц валюты, за которое указана цена
+    # (номинал валюты на эту дату); NULL - номинал неизвестен
+    # (котировки, загруженные до появления поля)
+    nominal = models.PositiveIntegerField(default=1, null=True)
+
+    objects = CurrencyPriceQuerySet.as_manager()
 
     class Meta:
         unique_together = ('date', 'currency')
         ordering = ('-date', 'currency')
+        indexes = [
+            # история цен валюты за период (аналитика):
+            # покрывающий индекс, value читается прямо из индекса
+            models.Index(
+                fields=['currency', '-date'],
+                include=['value'],
+                name='currencyprice_currency_date',
+            ),
+            # выборки по интервалу дат по всем валютам; история пополняется
+            # только новыми датами, поэтому BRIN-индекс крошечный
+            BrinIndex(
+                fields=['date'],
+                name='currencyprice_date_brin',
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f'{self.date.isoformat()} | '
+            f'{self.currency.char_code} | '
+            f'{self.value}'
+        )
+
+    def delete(self, *args, **kwargs) -> t.Tuple[int, t.Dict[str, int]]:
+        """Удаляет котировку так же, как удаление через QuerySet."""
+        return CurrencyPrice.objects.filter(pk=self.pk).delete()
+
+
+class LatestCurrencyPrice(models.Model):
+    """
+    Последняя загруженная котировка валюты.
+    Денормализованная таблица с одной строкой на валюту, обновляется
+    при загрузке котировок. Позволяет получать последние котировки
+    без просмотра всей истории цен.
+    """
+    currency = models.OneToOneField(
+        Currency,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='latest_price',
+    )
+    date = models.DateField()
+    value = models.DecimalField(decimal_places=4, max_digits=10)
+
+    class Meta:
+        ordering = ('currency',)
 
     def __str__(self):
         return (
@@ -38,6 +120,60 @@ class CurrencyPrice(models.Model):
         )
 
 
+class CurrencyPriceRollup(models.Model):
+    """
+    Свертка истории цен валюты за неделю или месяц (OHLC).
+    Пересчитывается при загрузке котировок только для затронутых периодов.
+    Позволяет строить графики за длинные периоды без выборки всех
+    дневных котировок.
+    """
+    class Interval(models.TextChoices):
+        WEEK = 'week', 'Неделя'
+        MONTH = 'month', 'Месяц'
+
+    currency = models.ForeignKey(
+        Currency,
+        on_delete=models.CASCADE,
+        related_name='rollups',
+    )
+    interval = models.CharField(max_length=5, choices=Interval.choices)
+    # первый день периода (понедельник или первое число месяца)
+    date = models.DateField()
+    open = models.DecimalField(decimal_places=4, max_digits=10)
+    high = models.DecimalField(decimal_places=4, max_digits=10)
+    low = models.DecimalField(decimal_places=4, max_digits=10)
+    close = models.DecimalField(decimal_places=4, max_digits=10)
+    average = models.DecimalField(decimal_places=4, max_digits=10)
+    # количество дней с котировками в периоде
+    count = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ('-date', 'currency')
+        unique_together = ('currency', 'interval', 'date')
+
+    def __str__(self):
+        return (
+            f'{self.date.isoformat()} | '
+            f'{self.currency.char_code} | '
+            f'{self.interval}'
+        )
+
+
+class ArchiveDay(models.Model):
+    """
+    День архива котировок, который уже был обработан при загрузке истории.
+    Используется для инкрементальной загрузки истории цен.
+    """
+    date = models.DateField(unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('-date',)
+
+    def __str__(self):
+        return self.date.isoformat()
+
+
 class UserCurrency(models.Model):
     """Модель для отслеживания пользователем стоимости валют."""
     user = models.ForeignKey(User, on_delete=models.CASCADE)
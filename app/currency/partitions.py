@@ -0,0 +1,74 @@
+import typing as t
+from datetime import date
+
+from django.db import connection, transaction
+
+from app.currency.models import CurrencyPrice
+
+COLUMNS = 'id, date, value, currency_id, nominal'
+
+
+def partition_name(year: int) -> str:
+    """Имя партиции таблицы котировок за год."""
+    return f'{CurrencyPrice._meta.db_table}_y{year}'
+
+
+def default_partition_name() -> str:
+    """
+    Имя партиции по умолчанию: в нее попадают котировки за годы,
+    для которых еще нет своей партиции.
+    """
+    return f'{CurrencyPrice._meta.db_table}_default'
+
+
+def create_price_partitions(year_from: int, year_to: int) -> t.List[int]:
+    """
+    Создает партиции таблицы котировок за годы из интервала
+    (включительно), если их еще нет. Возвращает годы созданных партиций.
+    Котировки за эти годы, уже попавшие в партицию по умолчанию,
+    переносятся в новую партицию.
+    """
+    created = []
+    for year in range(year_from, year_to + 1):
+        with transaction.atomic(), connection.cursor() as cursor:
+            if _create_partition(cursor, year):
+                created.append(year)
+    return created
+
+
+def _create_partition(cursor, year: int) -> bool:
+    table = CurrencyPrice._meta.db_table
+    partition = partition_name(year)
+    default = default_partition_name()
+    bounds = [date(year, 1, 1), date(year + 1, 1, 1)]
+
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [partition])
+    if cursor.fetchone()[0]:
+        return False
+
+    # блокируем партицию по умолчанию, чтобы новые котировки за этот год
+    # не попали в нее между переносом строк и подключением партиции
+    cursor.execute(f'LOCK TABLE {default} IN SHARE ROW EXCLUSIVE MODE')
+
+    # партиция создается отдельной таблицей и подключается после переноса:
+    # postgresql не даст создать партицию, пока строки за ее интервал
+    # лежат в партиции по умолчанию; check-ограничения (номинал) партиция
+    # должна иметь до подключения, поэтому копируются вместе со столбцами
+    cursor.execute(
+        f'CREATE TABLE {partition} (LIKE {table} INCLUDING CONSTRAINTS)'
+    )
+    cursor.execute(
+        f'WITH moved AS ('
+        f'  DELETE FROM {default} WHERE date >= %s AND date < %s '
+        f'  RETURNING {COLUMNS}'
+        f') '
+        f'INSERT INTO {partition} ({COLUMNS}) SELECT {COLUMNS} FROM moved',
+        bounds,
+    )
+    # индексы и внешние ключи партиция получает от основной таблицы
+    cursor.execute(
+        f'ALTER TABLE {table} ATTACH PARTITION {partition} '
+        f'FOR VALUES FROM (%s) TO (%s)',
+        bounds,
+    )
+    return True
@@ -0,0 +1,141 @@
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import typing as t
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+
+
+class PayloadArchive:
+    """
+    Локальный архив сырых ответов сервиса котировок.
+    На каждый месяц заводится один сжатый файл YYYY/YYYY-MM.json.gz вида
+    {"index": {дата: sha256}, "objects": {sha256: ответ сервиса}}.
+    Ответы адресуются по хешу содержимого, поэтому одинаковые документы
+    (например, архив за выходные дни) хранятся один раз.
+    Файл месяца перезаписывается под файловой блокировкой, поэтому
+    в архив можно писать из нескольких процессов одновременно.
+    """
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # ответы, которые еще не записаны на диск, по месяцам
+        self._pending: t.Dict[t.Tuple[int, int], t.Dict[date, t.Dict]] = (
+            defaultdict(dict)
+        )
+        self._lock = threading.Lock()
+
+    def add(self, day: date, payload: t.Dict) -> None:
+        """Добавляет ответ сервиса за указанный день в очередь на запись."""
+        with self._lock:
+            self._pending[(day.year, day.month)][day] = payload
+
+    def flush(self) -> None:
+        """Записывает накопленные ответы в файлы архива."""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(dict)
+
+        for (year, month), payloads in pending.items():
+            path = self._path(year, month)
+            # чтение, изменение и запись файла месяца - под блокировкой,
+            # иначе параллельные загрузки затрут дни друг друга
+            with self._locked(path):
+                month_data = self._read(path)
+
+                for day, payload in payloads.items():
+                    content = json.dumps(payload, sort_keys=True).encode()
+                    key = hashlib.sha256(content).hexdigest()
+
+                    month_data['objects'][key] = payload
+                    month_data['index'][day.isoformat()] = key
+
+                # убираем документы, на которые больше не ссылается
+                # ни один день
+                used = set(month_data['index'].values())
+                month_data['objects'] = {
+                    k: v for k, v in month_data['objects'].items()
+                    if k in used
+                }
+                self._write(path, month_data)
+
+    def iter_payloads(
+        self, date_from: date = None, date_to: date = None
+    ) -> t.Iterator[t.Tuple[t.List[date], t.Dict]]:
+        """
+        Перебирает сохраненные ответы сервиса в хронологическом порядке.
+        Каждый уникальный документ отдается один раз вместе со списком
+        дней, за которые он был получен.
+        """
+        for path in sorted(self.directory.glob('*/*.json.gz')):
+            year, month = map(int, path.name[:7].split('-'))
+            if date_from and (year, month) < (date_from.year, date_from.month):
+                continue
+            if date_to and (year, month) > (date_to.year, date_to.month):
+                continue
+
+            month_data = self._read(path)
+
+            dates_by_key = defaultdict(list)
+            for day, key in month_data['index'].items():
+                day = date.fromisoformat(day)
+                if date_from and day < date_from:
+                    continue
+                if date_to and day > date_to:
+                    continue
+                dates_by_key[key].append(day)
+
+            for key, dates in sorted(
+                dates_by_key.items(), key=lambda x: min(x[1])
+            ):
+                yield sorted(dates), month_data['objects'][key]
+
+    def years(self) -> t.List[int]:
+        """Годы, за которые в архиве есть ответы сервиса."""
+        return sorted(
+            int(x.name) for x in self.directory.iterdir()
+            if x.is_dir() and x.name.isdigit()
+        )
+
+    def _path(self, year: int, month: int) -> Path:
+        return self.directory / f'{year}' / f'{year}-{month:02d}.json.gz'
+
+    @staticmethod
+    @contextmanager
+    def _locked(path: Path) -> t.Iterator[None]:
+        """
+        Эксклюзивная блокировка файла архива между процессами.
+        Сам файл при записи подменяется новым, поэтому блокируется
+        отдельный файл рядом с ним.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = path.with_name(path.name.replace('.json.gz', '.lock'))
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read(path: Path) -> t.Dict:
+        try:
+            with gzip.open(path, 'rt') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'index': dict(), 'objects': dict()}
+
+    @staticmethod
+    def _write(path: Path, data: t.Dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # пишем через временный файл, чтобы не повредить архив при сбое
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,88 @@
+import threading
+import typing as t
+
+from app.currency.models import Currency
+from app.tools.helpers import CacheGeneration
+
+
+class CurrencyRegistry:
+    """
+    Реестр валют процесса: соответствие символьного кода валюты ее id.
+    Данные хранятся в памяти процесса, а версия реестра - в общем кеше.
+    При любой записи валют версия увеличивается, и каждый процесс
+    перечитывает реестр из БД при следующем обращении.
+    """
+    version_key = 'currency_registry_version'
+
+    def __init__(self) -> None:
+        self._ids: t.Dict[str, int] = dict()
+        self._char_codes: t.Dict[int, str] = dict()
+        self._version: t.Optional[int] = None
+        self._generation = CacheGeneration(self.version_key)
+        self._lock = threading.Lock()
+
+    def get_ids(self) -> t.Dict[str, int]:
+        """Возвращает id валют по их символьному коду."""
+        self._refresh()
+        return self._ids
+
+    def get_char_codes(self) -> t.Dict[int, str]:
+        """Возвращает символьные коды валют по их id."""
+        self._refresh()
+        return self._char_codes
+
+    def ensure(self, currencies: t.Iterable[t.Dict]) -> t.Dict[str, int]:
+        """
+        Возвращает id валют по их символьному коду, предварительно добавив
+        в БД валюты из переданного списка, которых там еще нет.
+        Валюты передаются в формате api: {'CharCode': ..., 'Name': ...}.
+        """
+        ids = self.get_ids()
+        missing = [x for x in currencies if x['CharCode'] not in ids]
+        if not missing:
+            return ids
+
+        Currency.objects.bulk_create(
+            objs=[
+                Currency(char_code=x['CharCode'], name=x['Name'])
+                for x in missing
+            ],
+            ignore_conflicts=True,
+        )
+        # получаем id только для добавленных валют
+        created = Currency.objects.filter(
+            char_code__in=[x['CharCode'] for x in missing]
+        ).values_list('char_code', 'id')
+
+        # bulk_create не отправляет сигналы, сообщаем другим процессам сами
+        version = self.invalidate()
+
+        with self._lock:
+            self._ids = {**self._ids, **dict(created)}
+            self._char_codes = {v: k for k, v in self._ids.items()}
+            # если других изменений не было, реестр процесса актуален
+            if self._version == version - 1:
+                self._version = version
+        return self._ids
+
+    def invalidate(self) -> int:
+        """
+        Помечает реестр устаревшим во всех процессах.
+        Возвращает новую версию реестра.
+        """
+        return self._generation.bump()
+
+    def _refresh(self) -> None:
+        """Перечитывает реестр из БД, если его версия изменилась."""
+        version = self._generation.get()
+        if version == self._version:
+            return
+
+        ids = dict(Currency.objects.values_list('char_code', 'id'))
+        with self._lock:
+            self._ids = ids
+            self._char_codes = {v: k for k, v in ids.items()}
+            self._version = version
+
+
+currency_registry = CurrencyRegistry()
@@ -0,0 +1,101 @@
+import typing as t
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from app.currency.models import CurrencyPrice, CurrencyPriceRollup
+
+Interval = CurrencyPriceRollup.Interval
+# точность цен в БД
+PRICE_QUANTUM = Decimal('0.0001')
+
+
+def period_start(d: date, interval: str) -> date:
+    """Первый день периода свертки, в который попадает дата."""
+    if interval == Interval.WEEK:
+        return d - timedelta(days=d.weekday())
+    return d.replace(day=1)
+
+
+def period_end(d: date, interval: str) -> date:
+    """Последний день периода свертки, в который попадает дата."""
+    start = period_start(d, interval)
+    if interval == Interval.WEEK:
+        return start + timedelta(days=6)
+    return (start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+
+
+def _average(values: t.List[Decimal]) -> Decimal:
+    """Среднее цен, округленное так же, как round() в postgresql."""
+    return (sum(values) / len(values)).quantize(PRICE_QUANTUM, ROUND_HALF_UP)
+
+
+def refresh_price_rollups(prices: t.Iterable[t.Tuple[int, date]]) -> None:
+    """
+    Пересчитывает свертки истории цен за периоды, в которые попадают
+    переданные котировки (id валюты, дата). Пересчитываются только
+    затронутые периоды, поэтому ежедневная загрузка обновляет
+    одну неделю и один месяц на валюту, а цены читаются одним запросом.
+    Свертки периодов, в которых не осталось котировок, удаляются.
+    """
+    periods = {
+        (currency_id, interval, period_start(d, interval))
+        for currency_id, d in prices
+        for interval in Interval.values
+    }
+    if not periods:
+        return
+
+    # даты всех затронутых периодов, объединенные в непрерывные интервалы
+    ranges = []
+    bounds = {
+        (start, period_end(start, interval)) for _, interval, start in periods
+    }
+    for start, end in sorted(bounds):
+        if ranges and start <= ranges[-1][1] + timedelta(days=1):
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+
+    qs = CurrencyPrice.objects.filter(
+        reduce(or_, (Q(date__range=x) for x in ranges)),
+        currency_id__in={x[0] for x in periods},
+    ).order_by('date').values_list('currency_id', 'date', 'value')
+
+    values = defaultdict(list)
+    for currency_id, d, value in qs:
+        for interval in Interval.values:
+            key = (currency_id, interval, period_start(d, interval))
+            if key in periods:
+                values[key].append(value)
+
+    CurrencyPriceRollup.objects.bulk_create(
+        objs=[
+            CurrencyPriceRollup(
+                currency_id=currency_id,
+                interval=interval,
+                date=start,
+                open=x[0],
+                high=max(x),
+                low=min(x),
+                close=x[-1],
+                average=_average(x),
+                count=len(x),
+            )
+            for (currency_id, interval, start), x in values.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['currency', 'interval', 'date'],
+        update_fields=['open', 'high', 'low', 'close', 'average', 'count'],
+    )
+
+    empty = periods - values.keys()
+    if empty:
+        CurrencyPriceRollup.objects.filter(reduce(or_, (
+            Q(currency_id=currency_id, interval=interval, date=start)
+            for currency_id, interval, start in empty
+        ))).delete()
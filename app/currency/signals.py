@@ -0,0 +1,68 @@
+import typing as t
+from datetime import date
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from app.currency.helpers import clear_api_cache, clear_user_currencies_cache
+from app.currency.loaders import refresh_latest_prices, update_latest_price
+from app.currency.models import (Currency, CurrencyPrice, UserCurrency,
+                                 prices_deleted)
+from app.currency.registry import currency_registry
+from app.currency.rollups import refresh_price_rollups
+
+
+@receiver([post_save, post_delete], sender=Currency)
+def invalidate_currency_registry(**kwargs) -> None:
+    """
+    Сбрасывает реестр валют и кеши api (в них есть коды валют)
+    при изменении списка валют.
+    """
+    currency_registry.invalidate()
+    clear_api_cache()
+
+
+@receiver(post_save, sender=CurrencyPrice)
+def update_latest_currency_price(instance: CurrencyPrice, **kwargs) -> None:
+    """
+    Обновляет последнюю котировку при сохранении отдельной цены
+    (массовая загрузка обновляет ее сама и сама сбрасывает кеши api).
+    """
+    update_latest_price(
+        instance.currency_id, instance.date, instance.value, instance.nominal
+    )
+    clear_api_cache()
+
+
+@receiver(prices_deleted, sender=CurrencyPrice)
+def refresh_latest_currency_prices(
+    deleted: t.Set[t.Tuple[int, date]], **kwargs
+) -> None:
+    """Пересчитывает последние котировки валют удаленных цен."""
+    refresh_latest_prices({currency_id for currency_id, _ in deleted})
+    clear_api_cache()
+
+
+@receiver(post_save, sender=CurrencyPrice)
+def update_price_rollups(instance: CurrencyPrice, **kwargs) -> None:
+    """
+    Пересчитывает свертки за периоды отдельной цены
+    (массовая загрузка пересчитывает их сама).
+    """
+    # дата сохраненной модели может быть строкой, если ее так передали
+    d = CurrencyPrice._meta.get_field('date').to_python(instance.date)
+    refresh_price_rollups([(instance.currency_id, d)])
+
+
+@receiver(prices_deleted, sender=CurrencyPrice)
+def refresh_deleted_price_rollups(
+    deleted: t.Set[t.Tuple[int, date]], **kwargs
+) -> None:
+    """Пересчитывает свертки за периоды удаленных цен."""
+    refresh_price_rollups(deleted)
+
+
+@receiver([post_save, post_delete], sender=UserCurrency)
+def invalidate_user_currencies(instance: UserCurrency, **kwargs) -> None:
+    """Сбрасывает кеш валют пользователя при изменении их списка."""
+    clear_user_currencies_cache(instance.user_id)
@@ -1,5 +1,7 @@
 import datetime
+import typing as t
 from itertools import groupby
+from logging import getLogger
 
 from django.conf import settings
 from django.db.models import F, Max, Q
@@ -8,20 +10,48 @@ from post_office import mail
 
 from app.currency.cbr_client import CbrDailyApiClient
 from app.currency.helpers import clear_api_cache
-from app.currency.models import CommonData, UserCurrency
+from app.currency.models import (CommonData, LatestCurrencyPrice,
+                                 UserCurrency)
+from app.currency.partitions import create_price_partitions
+from app.currency.warmup import warm_api_cache
 from sibdev_test_2.celery import app
 
+logger = getLogger(__name__)
+
 
 @app.task(name='currency.load_daily_prices')
-def load_daily_prices() -> None:
-    """ Задача для загрузки последних котировок."""
+def load_daily_prices() -> t.Optional[float]:
+    """
+    Задача для загрузки последних котировок.
+    Возвращает время прогрева кешей api в секундах.
+    """
     client = CbrDailyApiClient()
-    client.load_daily_prices()
+    loaded = client.load_daily_prices()
 
-    # отправляем имейлы
+    # отправляем имейлы, даже если документ не изменился с прошлой
+    # загрузки: задача сама пропускает день, за который они уже отправлены
     send_threshold_emails.delay()
+    if not loaded:
+        return None  # новых котировок нет
+
     # очищаем кеши представлений для api
     clear_api_cache()
+    # прогреваем кеши до прихода пользователей
+    warmup_time = warm_api_cache()
+    logger.info(f'Кеши api прогреты за {warmup_time:.3f} с')
+    return warmup_time
+
+
+@app.task(name='currency.create_price_partitions')
+def create_price_partitions_ahead() -> t.List[int]:
+    """
+    Задача для создания партиций таблицы котировок на текущий
+    и следующие годы. Возвращает годы созданных партиций.
+    """
+    year = datetime.date.today().year
+    return create_price_partitions(
+        year, year + settings.CURRENCY_PRICE_PARTITIONS_AHEAD
+    )
 
 
 @app.task(name='currency.send_threshold_emails')
@@ -39,6 +69,9 @@ def send_threshold_emails(force: bool = False) -> None:
     if common.price_email_latest_date == today and not force:
         return # имейлы уже отправлялись сегодня
 
+    if not LatestCurrencyPrice.objects.filter(date=today).exists():
+        return  # котировки за сегодня еще не загружены
+
     # определяем валюты с превышением ПЗ по пользователям
     qs = UserCurrency.objects.annotate(
         value=Max(
@@ -1,15 +1,22 @@
 import datetime
 import json
 import re
+import tempfile
+import threading
+import time
 import typing as t
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
 import responses
 from django.conf import settings
+from django.core.cache import cache
 from django.test import TestCase
 from faker import Faker
 
 from app.currency.cbr_client import CbrDailyApiClient
-from app.currency.models import Currency, CurrencyPrice
+from app.currency.cross_rates import BASE_CURRENCY, build_rate_table
+from app.currency.models import ArchiveDay, Currency, CurrencyPrice
 from app.currency.tests.helpers import fake_decimal
 
 fake = Faker(locale='ru')
@@ -43,24 +50,15 @@ class CbrApiClientTestCase(TestCase):
         super().setUp()
         Currency.objects.all().delete()
         CurrencyPrice.objects.all().delete()
+        ArchiveDay.objects.all().delete()
+
+        cache.clear()
 
     @responses.activate
     def test_load_price_history(self) -> None:
         """Проверяет загрузку истории цен."""
 
-        # мок ответа от api
-        def request_callback(request) -> t.Tuple[int, t.Dict, str]:
-            year, month, day = map(int, request.path_url.split('/')[2:5])
-            date = datetime.date(year, month, day)
-            data = self._api_prices_response(date)
-            return 200, {}, json.dumps(data)
-
-        url_regexp = r'/archive/\d{4}/\d{2}/\d{2}/daily_json.js'
-        responses.add_callback(
-            method=responses.GET,
-            url=re.compile(settings.CBR_DAILY_API_HOST + url_regexp),
-            callback=request_callback,
-        )
+        self.mock_archive_api()
 
         client = CbrDailyApiClient()
         client.load_price_history(days=self.history_days)
@@ -69,6 +67,36 @@ class CbrApiClientTestCase(TestCase):
         self.assert_currencies()
         self.assert_prices_history()
 
+    @responses.activate
+    def test_load_price_history_nominals(self) -> None:
+        """
+        Проверяет, что история загружается с номиналами на каждую дату,
+        а номинал валюты берется по последней котировке, хотя дни
+        архива загружаются от новых к старым.
+        """
+        char_code = next(
+            x for x, _ in self.currencies if x != BASE_CURRENCY
+        )
+        today = datetime.date.today()
+        for d, prices in self.prices_history.items():
+            # последние три дня цена указывается за 100 единиц валюты
+            prices[char_code]['Nominal'] = 100 if (today - d).days < 3 else 1
+
+        self.mock_archive_api()
+        CbrDailyApiClient().load_price_history(days=self.history_days)
+        self.assert_prices_history()
+
+        currency = Currency.objects.get(char_code=char_code)
+        self.assertEqual(currency.nominal, 100)
+
+        # курс учитывает номинал на дату котировки
+        for d in (today, today - datetime.timedelta(days=5)):
+            payload = self.prices_history[d][char_code]
+            self.assertAlmostEqual(
+                build_rate_table(d).rate(char_code, BASE_CURRENCY),
+                float(payload['Value']) / payload['Nominal'],
+            )
+
     @responses.activate
     def test_load_daily_prices(self) -> None:
         """Проверяет загрузку дневных котировок."""
@@ -85,6 +113,262 @@ class CbrApiClientTestCase(TestCase):
         self.assert_currencies()
         self.assert_daily_prices(date=today)
 
+    @responses.activate
+    def test_load_daily_prices_not_modified(self) -> None:
+        """
+        Проверяет, что при включенном http-кеше неизмененные дневные
+        котировки не разбираются и не сохраняются повторно.
+        """
+        today = datetime.date.today()
+        etag = '"v1"'
+
+        def request_callback(request) -> t.Tuple[int, t.Dict, str]:
+            if request.headers.get('If-None-Match') == etag:
+                return 304, {}, ''
+            data = self._api_prices_response(today)
+            return 200, {'ETag': etag}, json.dumps(data)
+
+        responses.add_callback(
+            method=responses.GET,
+            url=CbrDailyApiClient.daily_url,
+            callback=request_callback,
+        )
+
+        client = CbrDailyApiClient(cache_dir=self.create_cache_dir())
+        self.assertTrue(client.load_daily_prices())
+        self.assert_daily_prices(date=today)
+
+        with mock.patch.object(client, '_update_prices') as update_prices:
+            self.assertFalse(client.load_daily_prices())
+        update_prices.assert_not_called()
+
+        self.assertEqual(
+            responses.calls[-1].request.headers['If-None-Match'], etag
+        )
+
+    @responses.activate
+    def test_load_price_history_http_cache(self) -> None:
+        """
+        Проверяет, что дни архива, сохраненные в http-кеше,
+        повторно не скачиваются.
+        """
+        self.mock_archive_api()
+        cache_dir = self.create_cache_dir()
+
+        client = CbrDailyApiClient(cache_dir=cache_dir)
+        client.load_price_history(days=self.history_days)
+        self.assertEqual(len(responses.calls), self.history_days)
+
+        client = CbrDailyApiClient(cache_dir=cache_dir)
+        with mock.patch.object(client, '_parse_prices') as parse_prices:
+            client.load_price_history(days=self.history_days)
+        parse_prices.assert_not_called()
+        self.assertEqual(len(responses.calls), self.history_days)
+
+        self.assert_prices_history()
+
+    @responses.activate
+    def test_load_price_history_refetch(self) -> None:
+        """
+        Проверяет, что в режиме refetch дни архива скачиваются заново
+        мимо http-кеша и восстанавливают неизвестные номиналы котировок.
+        """
+        self.mock_archive_api()
+        cache_dir = self.create_cache_dir()
+
+        CbrDailyApiClient(cache_dir=cache_dir).load_price_history(
+            days=self.history_days
+        )
+        # котировки, загруженные до появления номиналов в БД
+        CurrencyPrice.objects.update(nominal=None)
+
+        CbrDailyApiClient(cache_dir=cache_dir).load_price_history(
+            days=self.history_days, refetch=True
+        )
+        self.assertEqual(len(responses.calls), 2 * self.history_days)
+        self.assert_prices_history()
+
+    @responses.activate
+    def test_replay_archive(self) -> None:
+        """
+        Проверяет восстановление истории цен из локального архива
+        ответов сервиса без обращения к сети.
+        """
+        self.mock_archive_api()
+        archive_dir = self.create_cache_dir()
+
+        client = CbrDailyApiClient(archive_dir=archive_dir)
+        client.load_price_history(days=self.history_days)
+        calls = len(responses.calls)
+
+        CurrencyPrice.objects.all().delete()
+        ArchiveDay.objects.all().delete()
+
+        client = CbrDailyApiClient(archive_dir=archive_dir)
+        client.replay_archive()
+
+        self.assertEqual(len(responses.calls), calls)
+        self.assertEqual(ArchiveDay.objects.count(), self.history_days)
+        self.assert_currencies()
+        self.assert_prices_history()
+
+    @responses.activate
+    def test_load_price_history_in_batches(self) -> None:
+        """
+        Проверяет, что история цен сохраняется в БД пачками
+        ограниченного размера.
+        """
+        self.mock_archive_api()
+
+        batch_size = 2 * len(self.currencies)
+        client = CbrDailyApiClient(batch_size=batch_size)
+        with mock.patch.object(
+            client, '_update_prices', wraps=client._update_prices
+        ) as update_prices:
+            client.load_price_history(days=self.history_days)
+
+        # каждая пачка не больше batch_size + одного дня котировок
+        self.assertGreater(update_prices.call_count, 1)
+        for call in update_prices.call_args_list:
+            self.assertLessEqual(
+                len(call.args[0]), batch_size + len(self.currencies)
+            )
+
+        self.assert_currencies()
+        self.assert_prices_history()
+
+    @responses.activate
+    def test_load_price_history_incremental(self) -> None:
+        """
+        Проверяет, что повторная инкрементальная загрузка истории
+        не делает запросов, если все дни уже загружены.
+        """
+        self.mock_archive_api()
+
+        client = CbrDailyApiClient()
+        client.load_price_history(days=self.history_days)
+        self.assertEqual(len(responses.calls), self.history_days)
+
+        steps = []
+        client.load_price_history(
+            days=self.history_days,
+            progress_callback=lambda **kwargs: steps.append(kwargs),
+            incremental=True,
+        )
+        self.assertEqual(len(responses.calls), self.history_days)
+        # пропущенные дни все равно передаются в callback
+        self.assertEqual(len(steps), self.history_days)
+
+        self.assert_prices_history()
+
+    @responses.activate
+    def test_load_price_history_resume(self) -> None:
+        """
+        Проверяет, что инкрементальная загрузка скачивает только
+        недостающие дни и не трогает уже обработанные.
+        """
+        self.mock_archive_api()
+
+        # как будто прошлая загрузка прервалась на середине
+        today = datetime.date.today()
+        loaded = [
+            today - datetime.timedelta(days=i)
+            for i in range(self.history_days // 2)
+        ]
+        ArchiveDay.objects.bulk_create([ArchiveDay(date=d) for d in loaded])
+
+        client = CbrDailyApiClient()
+        client.load_price_history(days=self.history_days, incremental=True)
+
+        requested = {
+            datetime.date(*map(int, call.request.path_url.split('/')[2:5]))
+            for call in responses.calls
+        }
+        self.assertEqual(len(responses.calls), self.history_days - len(loaded))
+        self.assertFalse(requested & set(loaded))
+        self.assertEqual(ArchiveDay.objects.count(), self.history_days)
+
+    def test_load_price_history_concurrency(self) -> None:
+        """
+        Проверяет, что история цен загружается с локального
+        сервера-заглушки параллельно, но не более чем в workers потоков.
+        """
+        # задержка ответа заглушки, имитирует сетевую задержку сервиса
+        delay = 0.1
+        test_case = self
+        # количество запросов, которые заглушка обрабатывает
+        # одновременно: текущее и максимальное
+        active = {'current': 0, 'max': 0}
+        lock = threading.Lock()
+
+        class StubHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                with lock:
+                    active['current'] += 1
+                    active['max'] = max(active['max'], active['current'])
+                try:
+                    time.sleep(delay)
+                finally:
+                    with lock:
+                        active['current'] -= 1
+
+                year, month, day = map(int, self.path.split('/')[2:5])
+                date = datetime.date(year, month, day)
+                body = json.dumps(test_case._api_prices_response(date))
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, *args) -> None:
+                pass  # не засоряем вывод тестов
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        host = f'http://127.0.0.1:{server.server_port}/'
+
+        max_active = dict()
+        for workers in (1, 4):
+            CurrencyPrice.objects.all().delete()
+            active['max'] = 0
+
+            client = CbrDailyApiClient(workers=workers, rate_limit=1000)
+            client.archive_url = host + client.archive_endpoint
+            client.load_price_history(days=self.history_days)
+            max_active[workers] = active['max']
+
+            self.assert_prices_history()
+
+        # в один поток запросы идут строго последовательно,
+        # а в несколько - параллельно, но не больше количества потоков
+        self.assertEqual(max_active[1], 1)
+        self.assertGreater(max_active[4], 1)
+        self.assertLessEqual(max_active[4], 4)
+
+    def create_cache_dir(self) -> str:
+        """Создает временную директорию для http-кеша."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        return tmp_dir.name
+
+    def mock_archive_api(self) -> None:
+        """Мокает ответы api архива котировок."""
+        def request_callback(request) -> t.Tuple[int, t.Dict, str]:
+            year, month, day = map(int, request.path_url.split('/')[2:5])
+            date = datetime.date(year, month, day)
+            data = self._api_prices_response(date)
+            return 200, {}, json.dumps(data)
+
+        url_regexp = r'/archive/\d{4}/\d{2}/\d{2}/daily_json.js'
+        responses.add_callback(
+            method=responses.GET,
+            url=re.compile(settings.CBR_DAILY_API_HOST + url_regexp),
+            callback=request_callback,
+        )
 
     @classmethod
     def _gen_api_currency_prices(cls) -> t.Dict[str, t.Dict]:
@@ -149,3 +433,4 @@ class CbrApiClientTestCase(TestCase):
             date_data = self.prices_history[x.date]
             currency_data = date_data[x.currency.char_code]
             self.assertEqual(str(x.value), currency_data['Value'])
+            self.assertEqual(x.nominal, currency_data['Nominal'] or 1)
@@ -0,0 +1,111 @@
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from app.currency.cross_rates import (BASE_CURRENCY, RateTable,
+                                      RateTableStore, build_rate_table)
+from app.currency.helpers import clear_api_cache
+from app.currency.models import Currency, CurrencyPrice
+from app.currency.tests.mixins import CurrenciesSetupMixin
+
+
+class RateTableTestCase(CurrenciesSetupMixin, TestCase):
+    """Кейс для проверки таблицы курсов для конвертации валют."""
+
+    # пятница, за выходные котировок нет
+    day = datetime.date(2024, 3, 1)
+
+    currency: Currency
+    other: Currency
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        super().setUpTestData()
+
+        # noinspection PyUnresolvedReferences
+        cls.currency, cls.other = [
+            x for x in cls.currencies if x.char_code != BASE_CURRENCY
+        ][:2]
+        # цена первой валюты указывается за 100 единиц,
+        # а днем раньше указывалась за одну
+        prices = (
+            (cls.currency, cls.day, '50', 100),
+            (cls.currency, cls.day - datetime.timedelta(days=1), '0.4', 1),
+            (cls.other, cls.day, '80', 1),
+            # номинал котировки неизвестен, курс по ней не считается
+            (cls.other, cls.day - datetime.timedelta(days=1), '75', None),
+        )
+        for currency, day, value, nominal in prices:
+            CurrencyPrice.objects.create(
+                date=day,
+                currency=currency,
+                value=Decimal(value),
+                nominal=nominal,
+            )
+
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+
+    def test_build_rate_table(self) -> None:
+        """
+        Проверяет курсы с учетом номинала, выбор последней даты
+        с котировками и кросс-курсы.
+        """
+        code, other = self.currency.char_code, self.other.char_code
+
+        table = build_rate_table(self.day + datetime.timedelta(days=2))
+        self.assertEqual(table.date, self.day)
+        self.assertEqual(table.rate(code, BASE_CURRENCY), 0.5)
+        self.assertEqual(table.rate(BASE_CURRENCY, other), 1 / 80)
+        self.assertEqual(table.rate(other, code), 160)
+
+        matrix = table.matrix([code, other])
+        expected = [[1, 0.5 / 80], [160, 1]]
+        for row, expected_row in zip(matrix, expected):
+            for value, expected_value in zip(row, expected_row):
+                self.assertAlmostEqual(value, expected_value)
+
+        restored = RateTable.loads(table.dumps())
+        self.assertEqual(restored.date, table.date)
+        self.assertEqual(restored.char_codes, table.char_codes)
+        self.assertEqual(restored.rates, table.rates)
+
+        # за прошлую дату используется номинал на эту дату
+        table = build_rate_table(self.day - datetime.timedelta(days=1))
+        self.assertEqual(table.rate(code, BASE_CURRENCY), 0.4)
+        self.assertNotIn(other, table.char_codes)
+
+        self.assertEqual(build_rate_table().date, self.day)
+        self.assertIsNone(build_rate_table(datetime.date(2000, 1, 1)))
+
+    def test_store(self) -> None:
+        """
+        Проверяет, что таблица строится один раз, в том числе
+        в другом процессе, и перестраивается при сбросе кешей api.
+        """
+        store = RateTableStore()
+        table = store.get(self.day)
+
+        with self.assertNumQueries(0):
+            self.assertIs(store.get(self.day), table)
+            # другой процесс берет таблицу из общего кеша
+            self.assertEqual(
+                RateTableStore().get(self.day).rates, table.rates
+            )
+
+        CurrencyPrice.objects.filter(currency=self.other).update(
+            value=Decimal('40')
+        )
+        clear_api_cache()
+        table = store.get(self.day)
+        self.assertEqual(
+            table.rate(self.other.char_code, BASE_CURRENCY), 40
+        )
+
+        # отсутствие котировок тоже кешируется
+        self.assertIsNone(store.get(datetime.date(2000, 1, 1)))
+        with self.assertNumQueries(0):
+            self.assertIsNone(RateTableStore().get(datetime.date(2000, 1, 1)))
@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase
+
+from app.currency.downsampling import lttb
+
+
+class LttbTestCase(SimpleTestCase):
+    """Кейс для проверки прореживания ряда алгоритмом LTTB."""
+
+    def test_short_series(self) -> None:
+        """Проверяет, что короткий ряд не прореживается."""
+        self.assertEqual(lttb([1, 2, 3], [1, 2, 3], max_points=3), [0, 1, 2])
+        self.assertEqual(lttb([1, 2, 3], [1, 2, 3], max_points=10), [0, 1, 2])
+
+    def test_downsampling(self) -> None:
+        """
+        Проверяет количество точек, сохранение первой и последней точки
+        и выбор выбросов, определяющих форму графика.
+        """
+        xs = list(range(100))
+        ys = [0] * 100
+        ys[30], ys[70] = 10, -10
+
+        selected = lttb(xs, ys, max_points=10)
+        self.assertEqual(len(selected), 10)
+        self.assertEqual(selected, sorted(selected))
+        self.assertEqual((selected[0], selected[-1]), (0, 99))
+        self.assertIn(30, selected)
+        self.assertIn(70, selected)
+
+    def test_keep(self) -> None:
+        """Проверяет, что обязательные точки попадают в результат."""
+        xs = list(range(100))
+        ys = [x % 7 for x in xs]
+
+        # 41 и 42 попадают в одну корзину
+        for max_points in (4, 10):
+            with self.subTest(max_points=max_points):
+                selected = lttb(xs, ys, max_points, keep=[0, 41, 42])
+                self.assertLessEqual(len(selected), max_points)
+                self.assertIn(41, selected)
+                self.assertIn(42, selected)
+                self.assertEqual(selected, sorted(set(selected)))
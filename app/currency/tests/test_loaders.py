@@ -0,0 +1,110 @@
+import datetime
+from decimal import Decimal
+
+from django.test import TestCase
+
+from app.currency.loaders import upsert_prices
+from app.currency.models import CurrencyPrice, LatestCurrencyPrice
+from app.currency.tests.mixins import CurrenciesSetupMixin
+
+
+class UpsertPricesTestCase(CurrenciesSetupMixin, TestCase):
+    """Кейс для проверки массовой загрузки котировок в БД."""
+
+    def test_upsert_prices(self) -> None:
+        """
+        Проверяет вставку новых котировок и обновление существующих,
+        в том числе при дублях внутри одной пачки.
+        """
+        today = datetime.date.today()
+        yesterday = today - datetime.timedelta(days=1)
+        currency = self.currencies[0]
+
+        CurrencyPrice.objects.create(
+            date=yesterday, currency=currency, value=Decimal('1')
+        )
+
+        upsert_prices(iter([
+            (yesterday, currency.id, '2.5000', 1),
+            (today, currency.id, '3.0000', 1),
+            (today, currency.id, '3.0000', 1),
+        ]))
+
+        prices = dict(
+            CurrencyPrice.objects
+              .filter(currency=currency)
+              .values_list('date', 'value')
+        )
+        self.assertEqual(prices, {
+            yesterday: Decimal('2.5'),
+            today: Decimal('3'),
+        })
+
+    def test_upsert_prices_twice_in_transaction(self) -> None:
+        """
+        Проверяет, что несколько загрузок подряд в одной транзакции
+        не конфликтуют из-за временной таблицы.
+        """
+        today = datetime.date.today()
+        for currency in self.currencies[:2]:
+            upsert_prices([(today, currency.id, '1.0000', 1)])
+
+        self.assertEqual(CurrencyPrice.objects.filter(date=today).count(), 2)
+
+    def test_upsert_prices_updates_latest(self) -> None:
+        """
+        Проверяет, что загрузка обновляет последние котировки
+        и номинал валюты и не затирает их более старыми данными.
+        """
+        today = datetime.date.today()
+        yesterday = today - datetime.timedelta(days=1)
+        currency = self.currencies[0]
+
+        upsert_prices([
+            (yesterday, currency.id, '1.0000', 1),
+            (today, currency.id, '200.0000', 100),
+        ])
+        # загрузка более старой истории с другим номиналом
+        upsert_prices([(yesterday, currency.id, '5.0000', 1)])
+
+        latest = LatestCurrencyPrice.objects.get(currency=currency)
+        self.assertEqual(latest.date, today)
+        self.assertEqual(latest.value, Decimal('200'))
+
+        currency.refresh_from_db()
+        self.assertEqual(currency.nominal, 100)
+        self.assertEqual(
+            dict(
+                CurrencyPrice.objects
+                  .filter(currency=currency)
+                  .values_list('date', 'nominal')
+            ),
+            {yesterday: 1, today: 100},
+        )
+
+    def test_delete_prices_refreshes_latest(self) -> None:
+        """
+        Проверяет, что удаление котировок пересчитывает последние
+        котировки затронутых валют.
+        """
+        today = datetime.date.today()
+        yesterday = today - datetime.timedelta(days=1)
+        first, second = self.currencies[:2]
+
+        upsert_prices([
+            (yesterday, first.id, '1.0000', 1),
+            (today, first.id, '2.0000', 1),
+            (today, second.id, '3.0000', 1),
+        ])
+
+        CurrencyPrice.objects.filter(date=today).delete()
+        latest = LatestCurrencyPrice.objects.get(currency=first)
+        self.assertEqual(latest.date, yesterday)
+        self.assertEqual(latest.value, Decimal('1'))
+        # у второй валюты котировок не осталось
+        self.assertFalse(
+            LatestCurrencyPrice.objects.filter(currency=second).exists()
+        )
+
+        CurrencyPrice.objects.get(currency=first).delete()
+        self.assertFalse(LatestCurrencyPrice.objects.exists())
@@ -0,0 +1,73 @@
+import datetime
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+
+from app.currency.models import CurrencyPrice
+from app.currency.partitions import (create_price_partitions,
+                                     default_partition_name, partition_name)
+from app.currency.tasks import create_price_partitions_ahead
+from app.currency.tests.mixins import CurrenciesSetupMixin
+
+
+class PricePartitionsTestCase(CurrenciesSetupMixin, TestCase):
+    """Кейс для проверки партиций таблицы котировок."""
+
+    def get_partition(self, price: CurrencyPrice) -> str:
+        """Возвращает имя партиции, в которой хранится котировка."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT tableoid::regclass::text '
+                f'FROM {CurrencyPrice._meta.db_table} WHERE id = %s',
+                [price.id],
+            )
+            return cursor.fetchone()[0]
+
+    def test_partition_created_ahead(self) -> None:
+        """Проверяет, что задача создает партиции на текущий и следующий год."""
+        year = datetime.date.today().year
+        # партиции создает миграция, повторный запуск ничего не меняет
+        self.assertEqual(create_price_partitions_ahead(), [])
+
+        for x in (year, year + 1):
+            price = CurrencyPrice.objects.create(
+                date=datetime.date(x, 6, 1),
+                currency=self.currencies[0],
+                value=Decimal('1'),
+            )
+            self.assertEqual(self.get_partition(price), partition_name(x))
+
+    def test_rows_moved_from_default_partition(self) -> None:
+        """
+        Проверяет, что котировки из партиции по умолчанию
+        переносятся в созданную партицию года.
+        """
+        year = 2200
+        price = CurrencyPrice.objects.create(
+            date=datetime.date(year, 3, 1),
+            currency=self.currencies[0],
+            value=Decimal('1'),
+        )
+        self.assertEqual(self.get_partition(price), default_partition_name())
+
+        # в тесте все идет в одной транзакции: проверяем отложенные
+        # внешние ключи сразу, иначе postgresql не даст подключить партицию
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+        self.assertEqual(create_price_partitions(year, year), [year])
+        self.assertEqual(self.get_partition(price), partition_name(year))
+        self.assertEqual(create_price_partitions(year, year), [])
+
+    def test_partition_pruning(self) -> None:
+        """Проверяет, что фильтр по датам читает только партицию года."""
+        year = datetime.date.today().year
+        plan = CurrencyPrice.objects.filter(
+            date__gte=datetime.date(year, 1, 1),
+            date__lte=datetime.date(year, 12, 31),
+        ).explain()
+
+        self.assertIn(partition_name(year), plan)
+        self.assertNotIn(partition_name(year + 1), plan)
+        self.assertNotIn(default_partition_name(), plan)
@@ -0,0 +1,49 @@
+import datetime
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from app.currency.payload_archive import PayloadArchive
+
+
+class PayloadArchiveTestCase(SimpleTestCase):
+    """Кейс для проверки локального архива ответов сервиса."""
+
+    def setUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.directory = tmp_dir.name
+
+    def test_concurrent_flush(self) -> None:
+        """
+        Проверяет, что запись двух архивов в один файл месяца
+        одновременно не теряет дни ни одного из них.
+        """
+        first = datetime.date(2024, 3, 1)
+        second = datetime.date(2024, 3, 2)
+
+        writer = PayloadArchive(self.directory)
+        writer.add(first, {'Date': first.isoformat()})
+        other = PayloadArchive(self.directory)
+        other.add(second, {'Date': second.isoformat()})
+
+        # второй архив пишет, пока первый прочитал файл месяца,
+        # но еще не записал его
+        other_flush = threading.Thread(target=other.flush)
+        read = PayloadArchive._read
+
+        def read_and_wait(path):
+            data = read(path)
+            other_flush.start()
+            other_flush.join(timeout=0.5)
+            return data
+
+        with mock.patch.object(writer, '_read', read_and_wait):
+            writer.flush()
+        other_flush.join()
+
+        archive = PayloadArchive(self.directory)
+        dates = [dates for dates, _ in archive.iter_payloads()]
+        self.assertEqual(dates, [[first], [second]])
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from app.currency.models import Currency
+from app.currency.registry import CurrencyRegistry
+from app.currency.tests.mixins import CurrenciesSetupMixin, fake
+
+
+class CurrencyRegistryTestCase(CurrenciesSetupMixin, TestCase):
+    """Кейс для проверки реестра валют."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+
+        self.registry = CurrencyRegistry()
+
+    def test_get_ids_without_queries(self) -> None:
+        """
+        Проверяет, что после загрузки реестр отдает валюты
+        без запросов к БД.
+        """
+        expected = {x.char_code: x.id for x in self.currencies}
+        self.assertEqual(self.registry.get_ids(), expected)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.registry.get_ids(), expected)
+            self.assertEqual(
+                self.registry.get_char_codes(),
+                {v: k for k, v in expected.items()},
+            )
+
+    def test_ensure_adds_only_missing(self) -> None:
+        """
+        Проверяет, что в БД добавляются только неизвестные валюты,
+        а реестр не перечитывается целиком.
+        """
+        self.registry.get_ids()
+
+        known = [
+            {'CharCode': x.char_code, 'Name': x.name}
+            for x in self.currencies
+        ]
+        char_code, name = fake.unique.currency()
+        new = {'CharCode': char_code, 'Name': name}
+
+        # вставка новых валют и получение их id
+        with self.assertNumQueries(2):
+            ids = self.registry.ensure(known + [new])
+
+        currency = Currency.objects.get(char_code=char_code)
+        self.assertEqual(ids[char_code], currency.id)
+
+        with self.assertNumQueries(0):
+            self.registry.ensure(known + [new])
+
+    def test_invalidated_on_currency_write(self) -> None:
+        """Проверяет, что реестр обновляется при изменении валют."""
+        self.registry.get_ids()
+
+        currency = self.create_currencies(n=1)[0]
+        self.assertEqual(
+            self.registry.get_ids()[currency.char_code], currency.id
+        )
+
+        currency.delete()
+        self.assertNotIn(currency.char_code, self.registry.get_ids())
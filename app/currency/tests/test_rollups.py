@@ -0,0 +1,131 @@
+import datetime
+from decimal import Decimal
+
+from django.test import TestCase
+
+from app.currency.loaders import upsert_prices
+from app.currency.models import CurrencyPrice, CurrencyPriceRollup
+from app.currency.rollups import period_end, period_start
+from app.currency.tests.mixins import CurrenciesSetupMixin
+
+Interval = CurrencyPriceRollup.Interval
+
+
+class PriceRollupsTestCase(CurrenciesSetupMixin, TestCase):
+    """Кейс для проверки сверток истории цен."""
+
+    def get_rollups(self, interval: str) -> dict:
+        """Возвращает свертки первой валюты: {дата: (o, h, l, c, avg, n)}."""
+        return {
+            x.date: (x.open, x.high, x.low, x.close, x.average, x.count)
+            for x in CurrencyPriceRollup.objects.filter(
+                currency=self.currencies[0], interval=interval
+            )
+        }
+
+    def test_periods(self) -> None:
+        """Проверяет границы периодов сверток."""
+        d = datetime.date(2024, 2, 15)  # четверг
+        self.assertEqual(
+            period_start(d, Interval.WEEK), datetime.date(2024, 2, 12)
+        )
+        self.assertEqual(
+            period_end(d, Interval.WEEK), datetime.date(2024, 2, 18)
+        )
+        self.assertEqual(
+            period_start(d, Interval.MONTH), datetime.date(2024, 2, 1)
+        )
+        self.assertEqual(
+            period_end(d, Interval.MONTH), datetime.date(2024, 2, 29)
+        )
+
+    def test_upsert_prices_refreshes_rollups(self) -> None:
+        """
+        Проверяет, что загрузка котировок пересчитывает свертки
+        затронутых периодов с учетом уже загруженных цен.
+        """
+        currency = self.currencies[0]
+        # среда, четверг и пятница на стыке месяцев
+        wed, thu, fri = (
+            datetime.date(2024, 1, 31) + datetime.timedelta(days=i)
+            for i in range(3)
+        )
+
+        upsert_prices([(wed, currency.id, '3.0000', 1)])
+        upsert_prices(iter([
+            (thu, currency.id, '1.0000', 1),
+            (fri, currency.id, '2.0000', 1),
+        ]))
+
+        self.assertEqual(self.get_rollups(Interval.WEEK), {
+            datetime.date(2024, 1, 29): (
+                Decimal('3'), Decimal('3'), Decimal('1'),
+                Decimal('2'), Decimal('2'), 3,
+            ),
+        })
+        self.assertEqual(self.get_rollups(Interval.MONTH), {
+            datetime.date(2024, 1, 1): (
+                Decimal('3'), Decimal('3'), Decimal('3'),
+                Decimal('3'), Decimal('3'), 1,
+            ),
+            datetime.date(2024, 2, 1): (
+                Decimal('1'), Decimal('2'), Decimal('1'),
+                Decimal('2'), Decimal('1.5'), 2,
+            ),
+        })
+
+    def test_single_price_refreshes_rollups(self) -> None:
+        """
+        Проверяет пересчет сверток при изменении и удалении
+        отдельной цены.
+        """
+        d = datetime.date(2024, 3, 4)
+        price = CurrencyPrice.objects.create(
+            date=d, currency=self.currencies[0], value=Decimal('1')
+        )
+        price.value = Decimal('5')
+        price.save()
+
+        rollup = self.get_rollups(Interval.MONTH)[datetime.date(2024, 3, 1)]
+        self.assertEqual(rollup[:4], (Decimal('5'),) * 4)
+
+        price.delete()
+        self.assertEqual(self.get_rollups(Interval.WEEK), {})
+        self.assertEqual(self.get_rollups(Interval.MONTH), {})
+
+    def test_single_price_with_string_date(self) -> None:
+        """Проверяет сохранение цены с датой, переданной строкой."""
+        CurrencyPrice.objects.create(
+            date='2031-05-05', currency=self.currencies[0], value=Decimal('1')
+        )
+        self.assertIn(
+            datetime.date(2031, 5, 1), self.get_rollups(Interval.MONTH)
+        )
+
+    def test_bulk_delete_refreshes_rollups(self) -> None:
+        """
+        Проверяет, что удаление котировок пересчитывает свертки
+        набором запросов, не зависящим от количества удаленных цен.
+        """
+        currency = self.currencies[0]
+        start = datetime.date(2024, 1, 1)
+        upsert_prices([
+            (start + datetime.timedelta(days=i), currency.id, f'{i + 1}', 1)
+            for i in range(50)
+        ])
+
+        # остаются котировки с 31 января по 19 февраля
+        with self.assertNumQueries(11):
+            CurrencyPrice.objects.filter(
+                date__lt=datetime.date(2024, 1, 31)
+            ).delete()
+
+        self.assertEqual(
+            list(self.get_rollups(Interval.MONTH)),
+            [datetime.date(2024, 2, 1), datetime.date(2024, 1, 1)],
+        )
+        rollup = self.get_rollups(Interval.MONTH)[datetime.date(2024, 1, 1)]
+        self.assertEqual(rollup, (Decimal('31'),) * 5 + (1,))
+        self.assertEqual(
+            min(self.get_rollups(Interval.WEEK)), datetime.date(2024, 1, 29)
+        )
@@ -0,0 +1,35 @@
+import datetime
+from unittest import mock
+
+from django.test import TestCase
+
+from app.currency.cbr_client import CbrDailyApiClient
+from app.currency.models import CommonData
+from app.currency.tasks import load_daily_prices, send_threshold_emails
+
+
+class CurrencyTasksTestCase(TestCase):
+    """Кейс для проверки задач загрузки котировок и отправки email-ов."""
+
+    def test_load_daily_prices_not_modified_sends_emails(self) -> None:
+        """
+        Проверяет, что email-ы отправляются, даже если документ
+        с котировками не изменился с прошлой загрузки.
+        """
+        with mock.patch.object(
+            CbrDailyApiClient, 'load_daily_prices', return_value=False
+        ), mock.patch.object(send_threshold_emails, 'delay') as delay:
+            self.assertIsNone(load_daily_prices())
+
+        delay.assert_called_once_with()
+
+    def test_send_threshold_emails_waits_for_prices(self) -> None:
+        """
+        Проверяет, что без котировок за сегодня день не отмечается
+        как обработанный, и email-ы уйдут после их загрузки.
+        """
+        send_threshold_emails()
+        self.assertNotEqual(
+            CommonData.get_solo().price_email_latest_date,
+            datetime.date.today(),
+        )
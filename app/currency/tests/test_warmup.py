@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from app.currency.helpers import clear_api_cache
+from app.currency.tests.mixins import CurrencyPricesSetupMixin
+from app.currency.warmup import get_rates_orderings, warm_api_cache
+from app.users.tests.mixins import UsersSetupMixin
+
+
+class WarmApiCacheTestCase(UsersSetupMixin,
+                           CurrencyPricesSetupMixin,
+                           APITestCase):
+    """Кейс для проверки прогрева кешей api."""
+
+    url = reverse('currency:rates')
+
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+
+    def test_warm_api_cache(self) -> None:
+        """
+        Проверяет, что после прогрева запросы к api котировок
+        активного пользователя и анонима не обращаются к БД.
+        """
+        self.user.last_login = timezone.now()
+        self.user.save()
+        inactive_user = self.create_user()
+
+        clear_api_cache()
+        warm_api_cache(users=1)
+
+        for user in (None, self.user):
+            self.client.force_authenticate(user)
+            for ordering in get_rates_orderings():
+                with self.subTest(user=user, ordering=ordering):
+                    params = {
+                        settings.REST_FRAMEWORK['ORDERING_PARAM']: ordering
+                    } if ordering else None
+
+                    with self.assertNumQueries(0):
+                        response = self.client.get(self.url, params)
+                    self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # валюты неактивного пользователя не кешируются заранее
+        self.client.force_authenticate(inactive_user)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
@@ -0,0 +1,57 @@
+import time
+import typing as t
+
+from django.conf import settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from app.currency.api.views import RatesView
+from app.currency.cross_rates import rate_tables
+from app.currency.helpers import get_user_currency_ids
+from app.users.models import User
+
+
+def get_rates_orderings() -> t.List[t.Optional[str]]:
+    """Поддерживаемые api котировок значения параметра сортировки."""
+    orderings = [None]
+    for field in RatesView.ordering_fields:
+        orderings += [field, f'-{field}']
+    return orderings
+
+
+def warm_api_cache(users: int = None) -> float:
+    """
+    Прогревает кеши api котировок после их сброса: выполняет запросы
+    к api так же, как клиенты, для каждого значения сортировки
+    (общий список котировок), строит таблицу курсов для конвертации
+    по последним котировкам и заполняет кеш отслеживаемых валют
+    самых активных пользователей (последние вошедшие),
+    если users больше нуля.
+    Возвращает время прогрева в секундах.
+    """
+    if users is None:
+        users = settings.CURRENCY_CACHE_WARMUP_USERS
+
+    started = time.monotonic()
+
+    view = RatesView.as_view()
+    url = reverse('currency:rates')
+    factory = APIRequestFactory()
+
+    active_users = list(
+        User.objects
+          .filter(is_active=True, last_login__isnull=False)
+          .order_by('-last_login')
+          .values_list('id', flat=True)[:users]
+    ) if users else []
+
+    for ordering in get_rates_orderings():
+        params = {settings.REST_FRAMEWORK['ORDERING_PARAM']: ordering}
+        view(factory.get(url, params if ordering else None))
+
+    rate_tables.get()
+
+    for user_id in active_users:
+        get_user_currency_ids(user_id)
+
+    return time.monotonic() - started
@@ -1,25 +1,129 @@
-from functools import wraps
+import threading
+import time
 import typing as t
 
-from django.http import HttpRequest
-from django.views.decorators.cache import cache_page
+from django.core.cache import cache
 
 
-def cache_per_user(timeout: int = None) -> t.Callable:
+class CacheGeneration:
     """
-    Декоратор, который кеширует страницы с разделением по пользователям.
-    Основано на https://stackoverflow.com/a/53209538.
+    Поколение (версия) группы ключей кеша.
+    Номер поколения входит в ключи группы, поэтому инвалидация всей группы -
+    один INCR без поиска ключей, а записи старых поколений просто истекают
+    по таймауту.
     """
-    def decorator(view_func: t.Callable) -> t.Callable:
-        @wraps(view_func)
-        def _wrapped_view(request: HttpRequest, *args, **kwargs) -> t.Callable:
-            user_id = 'anonymous'
-            if request.user.is_authenticated:
-                user_id = request.user.id
-
-            return cache_page(
-                timeout,
-                key_prefix=f'_user_{user_id}_',
-            )(view_func)(request, *args, **kwargs)
-        return _wrapped_view
-    return decorator
+    def __init__(self, key: str) -> None:
+        self.key = key
+
+    def get(self) -> int:
+        """Возвращает текущее поколение."""
+        generation = cache.get(self.key)
+        if generation is None:
+            self._init()
+            generation = cache.get(self.key)
+        return generation
+
+    def bump(self) -> int:
+        """Начинает новое поколение и возвращает его номер."""
+        self._init()
+        return cache.incr(self.key)
+
+    def _init(self) -> None:
+        """
+        Создает поколение в кеше, если его там нет.
+        Начальное значение зависит от времени, чтобы после очистки кеша
+        поколение гарантированно не совпало ни с одним из прежних.
+        """
+        cache.add(self.key, time.time_ns(), timeout=None)
+
+
+def cache_get_or_fill(
+    key: str,
+    fill: t.Callable[[], t.Any],
+    timeout: int,
+    stale_key: str = None,
+    lock_timeout: int = 10,
+    wait_timeout: float = 5,
+) -> t.Any:
+    """
+    Возвращает значение из кеша, а при промахе заполняет кеш
+    в единственном экземпляре (single-flight): значение вычисляет только
+    тот, кто взял короткую блокировку в кеше, остальные ждут его появления.
+    Если передан stale_key, вычисленное значение сохраняется и под ним
+    (ключ без поколения), и пока один процесс пересчитывает значение,
+    остальные сразу получают прежнее (stale-while-revalidate).
+    Таймаут обязателен, чтобы ключи не оставались в кеше навсегда.
+    Значение None не кешируется.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, timeout=lock_timeout):
+        try:
+            return _fill_cache(key, fill, timeout, stale_key)
+        finally:
+            cache.delete(lock_key)
+
+    if stale_key:
+        value = cache.get(stale_key)
+        if value is not None:
+            return value
+
+    # ждем, пока значение вычислит тот, кто взял блокировку
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+    # не дождались - вычисляем сами
+    return _fill_cache(key, fill, timeout, stale_key)
+
+
+def _fill_cache(
+    key: str,
+    fill: t.Callable[[], t.Any],
+    timeout: int,
+    stale_key: str = None,
+) -> t.Any:
+    value = fill()
+    if value is not None:
+        cache.set(key, value, timeout=timeout)
+        if stale_key:
+            # прежнее значение нужно дольше, чем живет основное
+            cache.set(stale_key, value, timeout=timeout * 2)
+    return value
+
+
+class TokenBucket:
+    """
+    Потокобезопасный ограничитель частоты запросов (token bucket).
+    Токены пополняются со скоростью rate в секунду, но не больше capacity.
+    """
+    def __init__(self, rate: float, capacity: int = 1) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Забирает токен; если токенов нет, ждет их пополнения."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated_at) * self.rate,
+                )
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,37 @@
+import typing as t
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountMixin:
+    """Миксин с проверками количества запросов к БД."""
+
+    def assertConstantQueries(
+        self,
+        request: t.Callable[[], t.Any],
+        grow: t.Callable[[], t.Any],
+        times: int = 2,
+    ) -> None:
+        """
+        Проверяет, что количество запросов к БД при вызове request
+        не растет с объемом данных: между вызовами данные увеличиваются
+        через grow. Перед каждым вызовом кеш очищается, чтобы считались
+        запросы без кеша.
+        """
+        counts = []
+        for i in range(times + 1):
+            if i:
+                grow()
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                request()
+            counts.append(len(queries))
+
+        # noinspection PyUnresolvedReferences
+        self.assertEqual(
+            len(set(counts)), 1,
+            f'Количество запросов растет с объемом данных: {counts}\n'
+            + '\n'.join(x['sql'] for x in queries.captured_queries),
+        )
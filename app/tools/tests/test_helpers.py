@@ -0,0 +1,119 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from app.tools.helpers import CacheGeneration, cache_get_or_fill
+
+
+class CacheGetOrFillTestCase(SimpleTestCase):
+    """Кейс для проверки заполнения кеша в единственном экземпляре."""
+
+    key = 'test_key'
+    stale_key = 'test_key:stale'
+
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+
+    def test_single_flight(self) -> None:
+        """
+        Проверяет, что при одновременных промахах значение
+        вычисляется один раз, а остальные запросы дожидаются его.
+        """
+        calls = []
+
+        def fill() -> int:
+            calls.append(1)
+            time.sleep(0.3)
+            return 42
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    cache_get_or_fill(self.key, fill, timeout=60)
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [42] * 5)
+
+    def test_stale_while_revalidate(self) -> None:
+        """
+        Проверяет, что пока значение пересчитывается,
+        возвращается прежнее значение без ожидания.
+        """
+        cache_get_or_fill(
+            self.key, lambda: 'old', timeout=60, stale_key=self.stale_key
+        )
+        new_key = 'test_key:new'
+
+        # значение нового ключа уже пересчитывает другой процесс
+        cache.add(f'{new_key}:lock', 1)
+
+        def fill() -> str:
+            raise AssertionError('Значение не должно вычисляться')
+
+        started = time.monotonic()
+        value = cache_get_or_fill(
+            new_key, fill, timeout=60, stale_key=self.stale_key
+        )
+        self.assertEqual(value, 'old')
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_fill_after_wait_timeout(self) -> None:
+        """
+        Проверяет, что если блокировку не отпустили вовремя,
+        значение вычисляется без нее.
+        """
+        cache.add(f'{self.key}:lock', 1)
+
+        value = cache_get_or_fill(
+            self.key, lambda: 'value', timeout=60, wait_timeout=0.1
+        )
+        self.assertEqual(value, 'value')
+        self.assertEqual(cache.get(self.key), 'value')
+
+    def test_fill_timeouts(self) -> None:
+        """
+        Проверяет, что значение и прежнее значение сохраняются
+        с таймаутом, а прежнее живет вдвое дольше.
+        """
+        with mock.patch.object(cache, 'set') as cache_set:
+            cache_get_or_fill(
+                self.key, lambda: 'value', timeout=60,
+                stale_key=self.stale_key,
+            )
+
+        self.assertEqual(cache_set.call_args_list, [
+            mock.call(self.key, 'value', timeout=60),
+            mock.call(self.stale_key, 'value', timeout=120),
+        ])
+
+
+class CacheGenerationTestCase(SimpleTestCase):
+    """Кейс для проверки поколений кеша."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+
+    def test_bump(self) -> None:
+        """Проверяет смену поколения, в том числе после очистки кеша."""
+        generation = CacheGeneration('test_generation')
+
+        first = generation.get()
+        self.assertEqual(generation.get(), first)
+        self.assertEqual(generation.bump(), first + 1)
+
+        cache.clear()
+        self.assertNotIn(generation.get(), (first, first + 1))
@@ -177,6 +177,28 @@ CBR_DAILY_API_HOST = env(
     'CBR_DAILY_API_HOST',
     default='https://www.cbr-xml-daily.ru',
 )
+# количество потоков для параллельной загрузки архива котировок
+CBR_DAILY_API_WORKERS = env.int('CBR_DAILY_API_WORKERS', default=4)
+# ограничение количества запросов к сервису в секунду
+CBR_DAILY_API_RATE_LIMIT = env.float('CBR_DAILY_API_RATE_LIMIT', default=10)
+# количество котировок, сохраняемых в БД за один запрос
+CBR_DAILY_API_BATCH_SIZE = env.int('CBR_DAILY_API_BATCH_SIZE', default=5000)
+# директория http-кеша для условных запросов к сервису (пусто - кеш отключен)
+CBR_DAILY_API_CACHE_DIR = env('CBR_DAILY_API_CACHE_DIR', default=None)
+# директория архива сырых ответов сервиса (пусто - ответы не сохраняются)
+CBR_DAILY_API_ARCHIVE_DIR = env('CBR_DAILY_API_ARCHIVE_DIR', default=None)
+
+# на сколько лет вперед создавать партиции таблицы котировок
+CURRENCY_PRICE_PARTITIONS_AHEAD = env.int(
+    'CURRENCY_PRICE_PARTITIONS_AHEAD', default=1
+)
+
+# для скольких последних вошедших пользователей прогревать кеш api
+# после загрузки котировок (0 - только общий список котировок)
+CURRENCY_CACHE_WARMUP_USERS = env.int('CURRENCY_CACHE_WARMUP_USERS', default=0)
+# время входа нужно только для выбора пользователей для прогрева,
+# без прогрева получение токена не пишет в БД
+SIMPLE_JWT['UPDATE_LAST_LOGIN'] = CURRENCY_CACHE_WARMUP_USERS > 0
 
 
 CELERY_TIMEZONE = TIME_ZONE
@@ -190,6 +212,10 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'currency.load_daily_prices',
         'schedule': crontab(minute='0', hour='12'),
     },
+    'create-price-partitions': {
+        'task': 'currency.create_price_partitions',
+        'schedule': crontab(minute='0', hour='3'),
+    },
 }
 
 